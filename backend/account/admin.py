@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import User
+from .models import AuditLog, OutgoingEmail, User
 
 
 @admin.register(User)
@@ -8,3 +8,19 @@ class UserAdmin(admin.ModelAdmin):
     search_fields = ('email', 'name', 'user_id')
     list_filter = ('is_verified', 'is_blocked', 'is_volunteer', 'is_admin_account')
     ordering = ('email',)
+
+
+@admin.register(OutgoingEmail)
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'to', 'status', 'attempts', 'created_at', 'sent_at')
+    search_fields = ('subject', 'to')
+    list_filter = ('status',)
+    readonly_fields = ('attempts', 'last_error', 'claimed_at', 'created_at', 'sent_at')
+
+
+@admin.register(AuditLog)
+class AuditLogAdmin(admin.ModelAdmin):
+    list_display = ('action', 'actor', 'affected', 'created_at')
+    list_filter = ('action',)
+    date_hierarchy = 'created_at'
+    readonly_fields = ('actor', 'action', 'criteria', 'changes', 'affected', 'affected_ids', 'created_at')
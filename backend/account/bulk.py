@@ -0,0 +1,107 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Q
+
+from dashboard.counters import USER_COUNT_FLAGS, adjust_user_counts
+from dashboard.document_store import invalidate_user_documents
+from dashboard.signals import DOCUMENT_USER_FIELDS
+from .models import AuditLog, User
+from .registration import verify_users
+
+
+# -------------------------------
+# Bulk user changes
+# -------------------------------
+#
+# Flags are changed for a whole selection of users with one UPDATE in one
+# transaction, after locking and reading the selected rows so each row's before
+# and after can be reported, and recorded as a single AuditLog. Verifying goes
+# through account.registration.verify_users so the users get registration IDs.
+# UPDATE sends no signals, so the counter and document side effects of the User
+# post_save handlers are applied here.
+
+BULK_FLAGS = (
+    'is_verified', 'is_blocked', 'is_member_account', 'is_volunteer', 'is_business_account',
+    'is_staff_account', 'is_admin_account', 'is_field_worker',
+)
+# Flags only admins may change
+ADMIN_ONLY_FLAGS = {'is_staff_account', 'is_admin_account'}
+MAX_USERS = 10000
+
+
+class BulkUpdateError(Exception):
+    pass
+
+
+def validate_changes(changes, actor):
+    if not isinstance(changes, dict) or not changes:
+        raise BulkUpdateError("changes must be an object of flags to set.")
+    unknown = set(changes) - set(BULK_FLAGS)
+    if unknown:
+        raise BulkUpdateError(f"Unknown or unsupported fields: {', '.join(sorted(unknown))}.")
+    if not all(isinstance(value, bool) for value in changes.values()):
+        raise BulkUpdateError("Flag values must be true or false.")
+    if ADMIN_ONLY_FLAGS.intersection(changes) and not actor.is_admin_account:
+        raise BulkUpdateError("Only admins can change staff or admin roles.")
+
+
+def bulk_update_users(actor, queryset, changes, criteria):
+    """
+    Apply `changes` ({flag: bool}) to every user in `queryset`. Returns
+    (per-user results, AuditLog); raises BulkUpdateError for invalid requests.
+    """
+    validate_changes(changes, actor)
+    fields = list(changes)
+    with transaction.atomic():
+        rows = list(queryset.select_for_update().order_by('pk').values('pk', 'user_id', *fields)[:MAX_USERS + 1])
+        if len(rows) > MAX_USERS:
+            raise BulkUpdateError(f"The selection matches more than {MAX_USERS} users; narrow it down.")
+        pks = [row['pk'] for row in rows]
+        if actor.pk in pks and (
+            changes.get('is_blocked') is True
+            or changes.get('is_admin_account') is False
+            or changes.get('is_staff_account') is False
+        ):
+            raise BulkUpdateError("You can't block yourself or remove your own role.")
+
+        verify = changes.get('is_verified') is True
+        plain = {field: value for field, value in changes.items() if not (verify and field == 'is_verified')}
+        if plain:
+            differs = Q()
+            for field, value in plain.items():
+                differs |= ~Q(**{field: value})
+            User.objects.filter(pk__in=pks).filter(differs).update(**plain)
+        new_ids = {}
+        if verify:
+            _, assigned = verify_users(pks)
+            new_ids = {user.pk: user.user_id for user in assigned}
+
+        results, affected, deltas, documents = [], [], defaultdict(int), []
+        counters = {flag: name for name, flag in USER_COUNT_FLAGS.items()}
+        for row in rows:
+            changed = {field: [row[field], value] for field, value in changes.items() if row[field] != value}
+            if row['pk'] in new_ids:
+                changed['user_id'] = [row['user_id'], new_ids[row['pk']]]
+            for field, (_, value) in changed.items():
+                # verify_users adjusts the verified counter itself
+                if field in counters and not (verify and field == 'is_verified'):
+                    deltas[counters[field]] += 1 if value else -1
+            if DOCUMENT_USER_FIELDS.intersection(changed):
+                documents.append(row['pk'])
+            if changed:
+                affected.append(row['pk'])
+            results.append({"id": row['pk'], "user_id": new_ids.get(row['pk'], row['user_id']), "changed": changed})
+
+        log = AuditLog.objects.create(
+            actor=actor, action='bulk_update_users', criteria=criteria, changes=changes,
+            affected=len(affected), affected_ids=affected,
+        )
+        transaction.on_commit(lambda: _after_update(deltas, documents))
+    return results, log
+
+
+def _after_update(deltas, documents):
+    adjust_user_counts(deltas)
+    for pk in documents:
+        invalidate_user_documents(pk)
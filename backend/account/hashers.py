@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+# -------------------------------
+# Password hashers
+# -------------------------------
+#
+# Django's PBKDF2 and Argon2 hashers with their cost read from settings, so the
+# cost can be tuned per deployment (see benchmark_auth). Hashes made with other
+# parameters still verify, and user.check_password() re-hashes them with the
+# current ones on the next successful login (must_update compares parameters).
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    @property
+    def iterations(self):
+        return settings.PASSWORD_PBKDF2_ITERATIONS
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    @property
+    def time_cost(self):
+        return settings.PASSWORD_ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self):
+        return settings.PASSWORD_ARGON2_MEMORY_COST
+
+    @property
+    def parallelism(self):
+        return settings.PASSWORD_ARGON2_PARALLELISM
@@ -0,0 +1,66 @@
+import hashlib
+
+from django.core.cache import cache
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.db.models.functions import Lower
+
+from .models import User
+
+
+# -------------------------------
+# Login identifier resolution
+# -------------------------------
+#
+# A login identifier may be an email (case-insensitive), phone, user_id or
+# username. All four are matched in one query, each against its own index
+# (lower(email) functional index, phone, and the unique user_id/username), with
+# that order of precedence when several users match. Identifiers that match no
+# one are remembered in the cache for MISS_TTL seconds, so repeated failed logins
+# don't reach the database. Cached misses are keyed by a version that is bumped
+# whenever a user is created or changes an identifier (see signals.py), which
+# drops them all at once.
+
+# User fields a login identifier is matched against
+IDENTIFIER_FIELDS = ('email', 'phone', 'user_id', 'username')
+MISS_TTL = 5 * 60
+VERSION_KEY = "login:identifiers:version"
+
+
+def _miss_key(version, identifier):
+    digest = hashlib.sha256(identifier.encode()).hexdigest()
+    return f"login:miss:{version}:{digest}"
+
+
+def mark_identifiers_changed():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 1, timeout=None)
+
+
+def resolve_login_identifier(identifier):
+    """The user an email, phone, user_id or username identifies, or None."""
+    version = cache.get(VERSION_KEY, 0)
+    miss_key = _miss_key(version, identifier)
+    if cache.get(miss_key):
+        return None
+
+    precedence = Case(
+        When(email_lower=identifier.lower(), then=Value(0)),
+        When(phone=identifier, then=Value(1)),
+        When(user_id=identifier, then=Value(2)),
+        default=Value(3),
+        output_field=IntegerField(),
+    )
+    user = (
+        User.objects.alias(email_lower=Lower('email'))
+        .filter(
+            Q(email_lower=identifier.lower()) | Q(phone=identifier)
+            | Q(user_id=identifier) | Q(username=identifier)
+        )
+        .order_by(precedence, 'pk')
+        .first()
+    )
+    if user is None:
+        cache.set(miss_key, 1, timeout=MISS_TTL)
+    return user
@@ -0,0 +1,181 @@
+import smtplib
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import OutgoingEmail
+
+
+# -------------------------------
+# Outgoing mail queue
+# -------------------------------
+#
+# Emails are stored as OutgoingEmail rows and sent by a single flusher at a time
+# (guarded by a Postgres advisory lock), in batches over one SMTP session, paced
+# to EMAIL_RATE_LIMIT messages per minute. Transient SMTP failures are retried
+# with exponential backoff; permanent ones, and errors building the message (e.g.
+# rendering its attachment), are marked FAILED with the error.
+
+FLUSH_LOCK_ID = 7310001
+# SENDING rows older than this belong to a flusher that died and are retried
+STALE_CLAIM = timedelta(minutes=15)
+RETRY_BASE_DELAY = 60
+RETRY_MAX_DELAY = 60 * 60
+
+
+def queue_email(subject, body, to, document_user=None, document_type="", attachment_name=""):
+    """
+    Queue an email and trigger a flush once the current transaction commits.
+
+    Args:
+        subject, body (str): Message content.
+        to (list): Recipient addresses.
+        document_user (User, optional): Owner of a document to attach.
+        document_type (str, optional): Document to attach, rendered at send time.
+        attachment_name (str, optional): Attachment filename.
+    """
+    from .tasks import flush_email_queue
+
+    email = OutgoingEmail.objects.create(
+        subject=subject,
+        body=body,
+        to=list(to),
+        document_user=document_user,
+        document_type=document_type or "",
+        attachment_name=attachment_name or "",
+    )
+    transaction.on_commit(flush_email_queue.delay)
+    return email
+
+
+def _claim_batch(size):
+    """Mark up to `size` due emails as SENDING and return them."""
+    now = timezone.now()
+    due = Q(status='QUEUED', next_attempt_at__lte=now) | Q(status='SENDING', claimed_at__lt=now - STALE_CLAIM)
+    with transaction.atomic():
+        batch = list(
+            # Only the email rows: FOR UPDATE can't lock the nullable side of the
+            # outer join to document_user
+            OutgoingEmail.objects.select_for_update(skip_locked=True, of=('self',))
+            .filter(due)
+            .select_related('document_user')
+            .order_by('next_attempt_at')[:size]
+        )
+        OutgoingEmail.objects.filter(pk__in=[email.pk for email in batch]).update(status='SENDING', claimed_at=now)
+    return batch
+
+
+def _build_message(email, smtp):
+    message = EmailMessage(
+        subject=email.subject,
+        body=email.body,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=email.to,
+        connection=smtp,
+    )
+    if email.document_type and email.document_user_id:
+        from dashboard.document_store import get_user_document, read_document
+
+        pdf_data = read_document(get_user_document(email.document_user, email.document_type))
+        message.attach(email.attachment_name or f"{email.document_type}.pdf", pdf_data, 'application/pdf')
+    return message
+
+
+def _is_transient(error):
+    """Whether an error from the SMTP connection or send is worth retrying."""
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in error.recipients.values())
+    return isinstance(error, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, OSError))
+
+
+def _mark_failed_attempt(email, error, retry):
+    email.attempts += 1
+    email.last_error = f"{type(error).__name__}: {error}"
+    if retry and email.attempts < settings.EMAIL_MAX_ATTEMPTS:
+        delay = min(RETRY_BASE_DELAY * 2 ** (email.attempts - 1), RETRY_MAX_DELAY)
+        email.status = 'QUEUED'
+        email.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+    else:
+        email.status = 'FAILED'
+    email.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at'])
+
+
+def _send_batch(batch, pace):
+    """
+    Send claimed emails over one SMTP session.
+    Returns (sent, failed, reachable); reachable is False if the server could not
+    be reached, in which case the rest of the batch is released for later.
+    """
+    sent = failed = 0
+    smtp = get_connection(fail_silently=False)
+    try:
+        for i, email in enumerate(batch):
+            started = time.monotonic()
+            try:
+                message = _build_message(email, smtp)
+            except Exception as e:
+                # A broken attachment won't fix itself: fail just this email
+                failed += 1
+                _mark_failed_attempt(email, e, retry=False)
+                continue
+            try:
+                # Opens the session on first use, or again after a dropped one
+                smtp.open()
+            except Exception as e:
+                failed += 1
+                _mark_failed_attempt(email, e, retry=_is_transient(e))
+                OutgoingEmail.objects.filter(pk__in=[rest.pk for rest in batch[i + 1:]]).update(status='QUEUED')
+                return sent, failed, False
+            try:
+                message.send()
+            except Exception as e:
+                failed += 1
+                _mark_failed_attempt(email, e, retry=_is_transient(e))
+                if isinstance(e, (smtplib.SMTPServerDisconnected, OSError)):
+                    smtp.close()
+            else:
+                sent += 1
+                email.status = 'SENT'
+                email.attempts += 1
+                email.last_error = ''
+                email.sent_at = timezone.now()
+                email.save(update_fields=['status', 'attempts', 'last_error', 'sent_at'])
+            time.sleep(max(0.0, pace - (time.monotonic() - started)))
+    finally:
+        smtp.close()
+    return sent, failed, True
+
+
+def flush_email_queue(max_seconds=None):
+    """
+    Send due queued emails until the queue is empty or `max_seconds` have passed.
+    Returns {"sent": int, "failed": int}, or None if another flush is running.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_try_advisory_lock(%s)", [FLUSH_LOCK_ID])
+        if not cursor.fetchone()[0]:
+            return None
+    try:
+        pace = 60.0 / settings.EMAIL_RATE_LIMIT if settings.EMAIL_RATE_LIMIT else 0.0
+        deadline = time.monotonic() + max_seconds if max_seconds else None
+        totals = {"sent": 0, "failed": 0}
+        while deadline is None or time.monotonic() < deadline:
+            batch = _claim_batch(settings.EMAIL_BATCH_SIZE)
+            if not batch:
+                break
+            sent, failed, reachable = _send_batch(batch, pace)
+            totals["sent"] += sent
+            totals["failed"] += failed
+            if not reachable:
+                break
+        return totals
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_unlock(%s)", [FLUSH_LOCK_ID])
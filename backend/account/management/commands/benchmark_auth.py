@@ -0,0 +1,95 @@
+import os
+import time
+from multiprocessing import Pool
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils.module_loading import import_string
+
+PASSWORD = "benchmark-Passw0rd!"
+
+
+def _hash_rates(args):
+    """(registrations/s, logins/s) of one process: make_password and check_password."""
+    name, overrides, seconds = args
+    with override_settings(**overrides):
+        hasher = import_string(settings.PASSWORD_HASHER_CLASSES[name])()
+        encoded = hasher.encode(PASSWORD, hasher.salt())
+        return (
+            _rate(lambda: hasher.encode(PASSWORD, hasher.salt()), seconds / 2),
+            _rate(lambda: hasher.verify(PASSWORD, encoded), seconds / 2),
+        )
+
+
+def _rate(operation, seconds):
+    count, start = 0, time.perf_counter()
+    while (elapsed := time.perf_counter() - start) < seconds:
+        operation()
+        count += 1
+    return count / elapsed
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure password hashing throughput (registrations/s and logins/s per process and '
+        'for a pool of processes) for the configured or given hashers, and optionally the '
+        'full token endpoint for an existing account'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hashers', default=settings.PASSWORD_HASHER,
+                            help=f'Comma-separated, of: {", ".join(settings.PASSWORD_HASHER_CLASSES)}')
+        parser.add_argument('--pbkdf2-iterations', default='',
+                            help='Comma-separated PBKDF2 iteration counts to compare (default: the setting)')
+        parser.add_argument('--seconds', type=float, default=4.0, help='Measuring time per configuration')
+        parser.add_argument('--processes', type=int, default=os.cpu_count(),
+                            help='Processes to measure together, e.g. gunicorn workers per host')
+        parser.add_argument('--username', help='Also time POSTs to the token endpoint with this login')
+        parser.add_argument('--password')
+
+    def handle(self, *args, **options):
+        configurations = []
+        for name in options['hashers'].split(','):
+            name = name.strip()
+            if name not in settings.PASSWORD_HASHER_CLASSES:
+                raise CommandError(f"Unknown hasher {name!r}")
+            if name == 'pbkdf2' and options['pbkdf2_iterations']:
+                for iterations in options['pbkdf2_iterations'].split(','):
+                    configurations.append((name, {'PASSWORD_PBKDF2_ITERATIONS': int(iterations)}))
+            else:
+                configurations.append((name, {}))
+
+        seconds, processes = options['seconds'], options['processes']
+        self.stdout.write(f"{'hasher':<32} {'registrations/s':>22} {'logins/s':>22}")
+        self.stdout.write(f"{'':<32} {'1 proc':>10} {f'{processes} procs':>11} {'1 proc':>10} {f'{processes} procs':>11}")
+        for name, overrides in configurations:
+            label = name + ''.join(f" {value}" for value in overrides.values())
+            single = _hash_rates((name, overrides, seconds))
+            with Pool(processes) as pool:
+                rates = pool.map(_hash_rates, [(name, overrides, seconds)] * processes)
+            total = [sum(rate[i] for rate in rates) for i in (0, 1)]
+            self.stdout.write(
+                f"{label:<32} {single[0]:>10.1f} {total[0]:>11.1f} {single[1]:>10.1f} {total[1]:>11.1f}"
+            )
+
+        if options['username']:
+            self._benchmark_endpoint(options['username'], options['password'] or '', seconds)
+
+    def _benchmark_endpoint(self, username, password, seconds):
+        """Sequential token requests in this process: hashing plus lookup, DB and JWT overhead."""
+        client = Client(SERVER_NAME='localhost')
+        url = reverse('token_obtain_pair')
+        data = {'username': username, 'password': password}
+        response = client.post(url, data)
+        if response.status_code != 200:
+            raise CommandError(f"Login failed ({response.status_code}): {response.content[:200]!r}")
+
+        requests, start = 0, time.perf_counter()
+        while time.perf_counter() - start < seconds:
+            client.post(url, data)
+            requests += 1
+        elapsed = time.perf_counter() - start
+        self.stdout.write(f"token endpoint: {requests / elapsed:.1f} logins/s in one process "
+                          f"({elapsed / requests * 1000:.1f} ms each)")
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:36
+
+from django.db import migrations, models
+from django.db.models import BigIntegerField, Max
+from django.db.models.functions import Cast, Substr
+
+
+def seed_registration_counter(apps, schema_editor):
+    # Start after the highest R0000001-style ID handed out so far
+    User = apps.get_model('account', 'User')
+    IdCounter = apps.get_model('account', 'IdCounter')
+    last = (
+        User.objects.filter(user_id__regex=r'^R[0-9]+$')
+        .annotate(number=Cast(Substr('user_id', 2), BigIntegerField()))
+        .aggregate(last=Max('number'))['last']
+    )
+    IdCounter.objects.update_or_create(name='registration', defaults={'value': last or 0})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0009_login_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdCounter',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(seed_registration_counter, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,7 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.db.models.functions import Lower
+from django.utils import timezone
 
 def user_directory_path(instance, filename):
     return f'user_uploads/{instance.name}/{filename}'
@@ -42,7 +44,77 @@ class User(AbstractUser):
     is_member_account = models.BooleanField(default=False)
     is_field_worker = models.BooleanField(default=False)
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Keyset pagination on (date_joined, id)
+            models.Index(fields=['date_joined', 'id'], name='user_date_joined_id'),
+            # Login lookups (account.identifiers)
+            models.Index(Lower('email'), name='user_email_lower'),
+            models.Index(fields=['phone'], name='user_phone'),
+        ]
+
     def __str__(self):
         return self.email
-    
 
+
+class IdCounter(models.Model):
+    """Last number handed out for a kind of ID (see account.registration.allocate_ids)."""
+    name = models.CharField(max_length=50, primary_key=True)
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
+
+class OutgoingEmail(models.Model):
+    """A queued email. Sent in batches by account.tasks.flush_email_queue."""
+    STATUS_CHOICES = [
+        ('QUEUED', 'Queued'),
+        ('SENDING', 'Sending'),
+        ('SENT', 'Sent'),
+        ('FAILED', 'Failed'),
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    to = models.JSONField(default=list)
+
+    # Optional document attachment, rendered when the email is sent
+    document_user = models.ForeignKey(User, on_delete=models.CASCADE, blank=True, null=True, related_name='outgoing_emails')
+    document_type = models.CharField(max_length=50, blank=True)
+    attachment_name = models.CharField(max_length=255, blank=True)
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='QUEUED')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claimed_at = models.DateTimeField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.to)} ({self.status})"
+
+
+class AuditLog(models.Model):
+    """One record per administrative bulk action (see account.bulk)."""
+    actor = models.ForeignKey(User, on_delete=models.SET_NULL, blank=True, null=True, related_name='audit_logs')
+    action = models.CharField(max_length=50)
+    # How the rows were selected (ids and/or filters) and what was applied
+    criteria = models.JSONField(default=dict, blank=True)
+    changes = models.JSONField(default=dict, blank=True)
+    affected = models.PositiveIntegerField(default=0)
+    affected_ids = models.JSONField(default=list, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.action} by {self.actor_id} at {self.created_at}: {self.affected} rows"
+
+    class Meta:
+        ordering = ['-created_at']
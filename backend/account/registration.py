@@ -0,0 +1,74 @@
+import re
+
+from django.db import transaction
+
+from dashboard.counters import adjust_user_counts
+from dashboard.document_store import invalidate_user_documents
+from dashboard.fuzzy import FUZZY_INDEXES
+from .identifiers import mark_identifiers_changed
+from .models import IdCounter, User
+
+
+# -------------------------------
+# Registration IDs
+# -------------------------------
+#
+# Verified users get a sequential R0000001-style user_id. Numbers come from an
+# IdCounter row, locked with SELECT ... FOR UPDATE for the rest of the caller's
+# transaction, so concurrent verifications queue on that one row instead of
+# scanning for the highest existing ID and colliding, and a rolled-back
+# verification leaves no gap. Any number of IDs is allocated in one update.
+
+REGISTRATION_COUNTER = 'registration'
+REGISTRATION_ID_RE = re.compile(r'R\d{7,}')
+
+
+def registration_id(number):
+    return f"R{number:07d}"
+
+
+def allocate_ids(name, count=1):
+    """Reserve `count` consecutive numbers from a counter, as a range."""
+    with transaction.atomic():
+        counter, _ = IdCounter.objects.select_for_update().get_or_create(name=name)
+        counter.value += count
+        counter.save(update_fields=['value'])
+    return range(counter.value - count + 1, counter.value + 1)
+
+
+def advance_counter(name, value):
+    """Move a counter up to at least `value`, e.g. past IDs assigned elsewhere."""
+    IdCounter.objects.get_or_create(name=name)
+    IdCounter.objects.filter(name=name, value__lt=value).update(value=value)
+
+
+def verify_users(pks):
+    """
+    Verify users and give those without one a registration ID, in pk order.
+    Returns (users found, users that got a new ID).
+    """
+    with transaction.atomic():
+        # Rows are locked in pk order, then the counter, so verifiers can't deadlock
+        users = list(User.objects.select_for_update().filter(pk__in=pks).order_by('pk'))
+        pending = [user for user in users if not (user.is_verified and REGISTRATION_ID_RE.fullmatch(user.user_id))]
+        if not pending:
+            return users, []
+
+        newly_verified = sum(1 for user in pending if not user.is_verified)
+        for user, number in zip(pending, allocate_ids(REGISTRATION_COUNTER, len(pending))):
+            user.is_verified = True
+            user.user_id = user.username = registration_id(number)
+        User.objects.bulk_update(pending, ['is_verified', 'user_id', 'username'], batch_size=1000)
+
+        # bulk_update sends no signals: do what the User post_save handlers would
+        changed = [user.pk for user in pending]
+        transaction.on_commit(lambda: _after_verify(changed, newly_verified))
+    return users, pending
+
+
+def _after_verify(pks, newly_verified):
+    adjust_user_counts({'verified_user': newly_verified})
+    mark_identifiers_changed()
+    FUZZY_INDEXES['user'].mark_changed()
+    for pk in pks:
+        invalidate_user_documents(pk)
@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from .models import User
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from .identifiers import resolve_login_identifier
 
 class UserJoinSerializer(serializers.ModelSerializer):
     referred_by = serializers.SlugRelatedField(slug_field='user_id', queryset=User.objects.all(), required=False, allow_null=True)
@@ -25,13 +26,8 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         if not username or not password:
             raise serializers.ValidationError("Username and password are required.")
 
-        # Try to find user via multiple fields
-        user = (
-            User.objects.filter(email__iexact=username).first()
-            or User.objects.filter(phone=username).first()
-            or User.objects.filter(user_id=username).first()
-            or User.objects.filter(username=username).first()
-        )
+        # Email, phone, user_id or username, in one query
+        user = resolve_login_identifier(username)
 
         if user is None:
             raise serializers.ValidationError("User not found.")
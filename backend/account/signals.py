@@ -0,0 +1,27 @@
+from django.db import transaction
+from django.db.models.signals import post_init, post_save
+from django.dispatch import receiver
+
+from .identifiers import IDENTIFIER_FIELDS, mark_identifiers_changed
+from .models import User
+
+
+def _identifiers(instance):
+    # Read from __dict__ so deferred fields aren't loaded
+    return tuple(instance.__dict__.get(field) for field in IDENTIFIER_FIELDS)
+
+
+@receiver(post_init, sender=User)
+def remember_identifiers(sender, instance, **kwargs):
+    instance._login_identifiers = _identifiers(instance)
+
+
+@receiver(post_save, sender=User)
+def identifiers_saved(sender, instance, created, **kwargs):
+    identifiers = _identifiers(instance)
+    if not created and identifiers == instance._login_identifiers:
+        return
+    instance._login_identifiers = identifiers
+    # A cached miss may now resolve to this user
+    transaction.on_commit(mark_identifiers_changed)
+
@@ -1,19 +1,20 @@
 from celery import shared_task
-from django.core.mail import EmailMessage
-from django.conf import settings
+
+from . import mail
+
 
 @shared_task
 def send_async_email(subject, message, recipient_list, pdf_data=None, pdf_filename=None):
-    try:
-        email = EmailMessage(
-            subject=subject,
-            body=message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            to=recipient_list,
-        )
-        if pdf_data and pdf_filename:
-            email.attach(pdf_filename, pdf_data, 'application/pdf')
-        email.send()
-        return True
-    except Exception as e:
-        return False
\ No newline at end of file
+    """
+    Queue an email for the batched sender (kept for existing callers).
+    pdf_data/pdf_filename are accepted, and ignored, only so tasks queued before
+    the mail queue existed still run; remove them in the next release.
+    """
+    mail.queue_email(subject, message, recipient_list)
+    return True
+
+
+@shared_task
+def flush_email_queue():
+    """Send queued emails. Triggered on enqueue and periodically by celery beat."""
+    return mail.flush_email_queue(max_seconds=240)
@@ -1,3 +1,60 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.core import mail
+from django.test import TestCase, override_settings
+
+from .mail import flush_email_queue, queue_email
+from .models import OutgoingEmail, User
+
+# Signals touch the shared cache (user counters, fuzzy index versions)
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(
+    CACHES=LOCMEM_CACHES,
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    EMAIL_RATE_LIMIT=0,
+    EMAIL_MAX_ATTEMPTS=5,
+)
+class EmailQueueTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='member', email='member@example.com', user_id='R0000001')
+
+    def test_flush_sends_queued_email(self):
+        email = queue_email('Welcome', 'Hello', ['member@example.com'])
+
+        self.assertEqual(flush_email_queue(), {'sent': 1, 'failed': 0})
+
+        email.refresh_from_db()
+        self.assertEqual(email.status, 'SENT')
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['member@example.com'])
+
+    def test_flush_attaches_document(self):
+        email = queue_email('Your ID card', 'Attached', ['member@example.com'],
+                            document_user=self.user, document_type='id_card', attachment_name='card.pdf')
+
+        with mock.patch('dashboard.document_store.get_user_document', return_value='documents/1/card.pdf'), \
+                mock.patch('dashboard.document_store.read_document', return_value=b'%PDF-1.4'):
+            self.assertEqual(flush_email_queue(), {'sent': 1, 'failed': 0})
+
+        email.refresh_from_db()
+        self.assertEqual(email.status, 'SENT')
+        self.assertEqual(mail.outbox[0].attachments[0][0], 'card.pdf')
+
+    def test_attachment_error_fails_only_that_email(self):
+        broken = queue_email('Your ID card', 'Attached', ['member@example.com'],
+                             document_user=self.user, document_type='id_card')
+        plain = queue_email('Welcome', 'Hello', ['member@example.com'])
+
+        with mock.patch('dashboard.document_store.get_user_document', side_effect=FileNotFoundError('photo')):
+            self.assertEqual(flush_email_queue(), {'sent': 1, 'failed': 1})
+
+        broken.refresh_from_db()
+        plain.refresh_from_db()
+        # Not retried: rendering would fail the same way
+        self.assertEqual(broken.status, 'FAILED')
+        self.assertEqual(broken.attempts, 1)
+        self.assertEqual(plain.status, 'SENT')
+        self.assertFalse(OutgoingEmail.objects.filter(status__in=['QUEUED', 'SENDING']).exists())
@@ -3,7 +3,7 @@ from rest_framework_simplejwt.views import (
     TokenRefreshView,
     TokenVerifyView,
 )
-from .views import UserJoinView, UserMemberView, UserListView, UserDetailView, VerifyUserView, CustomTokenObtainPairView, ChangePasswordView, ChangePasswordByAdminView
+from .views import UserJoinView, UserMemberView, UserListView, UserDetailView, VerifyUserView, BulkVerifyUserView, BulkUserUpdateView, CustomTokenObtainPairView, ChangePasswordView, ChangePasswordByAdminView
 
 urlpatterns = [
     path('join/', UserJoinView.as_view(), name='user_join'),
@@ -15,6 +15,8 @@ urlpatterns = [
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('token/verify/', TokenVerifyView.as_view(), name='token_verify'),
     path('verify/<int:id>/', VerifyUserView.as_view(), name='verify_user'),
+    path('verify/bulk/', BulkVerifyUserView.as_view(), name='bulk_verify_users'),
+    path('bulk-update/', BulkUserUpdateView.as_view(), name='bulk_update_users'),
     path('change-password/', ChangePasswordView.as_view(), name='change_password'),
     path('change-password/<int:id>/', ChangePasswordByAdminView.as_view(), name='change_password_by_admin'),
 ]
\ No newline at end of file
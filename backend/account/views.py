@@ -5,16 +5,18 @@ from datetime import datetime
 from django.contrib.auth.hashers import make_password
 import uuid
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Max
 
 from account.models import User
 from rest_framework.generics import ListAPIView
 from rest_framework.filters import SearchFilter
 from django_filters.rest_framework import DjangoFilterBackend
+from django_filters.filterset import filterset_factory
 from django.db.models import Count
 from dashboard.permissions import IsAdminOrIsStaff
 from dashboard.serializers import UserInfoSerializer
 from .serializers import UserJoinSerializer, UserMemberSerializer, CustomTokenObtainPairSerializer
+from .registration import verify_users
+from .bulk import BulkUpdateError, bulk_update_users
 from rest_framework_simplejwt.views import TokenObtainPairView
 
 
@@ -75,12 +77,16 @@ class UserMemberView(APIView):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
+USER_FILTER_FIELDS = ['is_verified', 'is_blocked', 'is_member_account', 'is_volunteer', 'is_business_account', 'is_staff_account', 'is_admin_account', 'user_id', 'id', 'email']
+UserFilterSet = filterset_factory(User, fields=USER_FILTER_FIELDS)
+
 class UserListView(ListAPIView):
     permission_classes = [IsAdminOrIsStaff]
-    queryset = User.objects.annotate(referral_count=Count('user_referrals')).order_by('-date_joined')
+    queryset = User.objects.annotate(referral_count=Count('user_referrals')).select_related('referred_by').order_by('-date_joined')
+    keyset_ordering = ('-date_joined', '-id')
     serializer_class = UserInfoSerializer
     filter_backends = [SearchFilter, DjangoFilterBackend]
-    filterset_fields = ['is_verified', 'is_blocked', 'is_member_account', 'is_volunteer', 'is_business_account', 'is_staff_account', 'is_admin_account', 'user_id', 'id', 'email']
+    filterset_fields = USER_FILTER_FIELDS
     search_fields = ['name', 'email', 'phone', 'user_id']
 
 class UserDetailView(APIView):
@@ -126,24 +132,84 @@ class VerifyUserView(APIView):
     permission_classes = [IsAdminOrIsStaff]
 
     def post(self, request, id):
-        try:
-            user = User.objects.get(id=id)
-        except User.DoesNotExist:
+        users, _ = verify_users([id])
+        if not users:
             return Response({"error": "User not found."}, status=status.HTTP_404_NOT_FOUND)
-        user.is_verified = True
-        last_user = User.objects.filter(user_id__startswith="R").aggregate(Max("user_id"))["user_id__max"]
-        if last_user:
-            last_num = int(last_user[1:])
-            new_num = last_num + 1
-        else:
-            new_num = 1
-        user.user_id = f"R{new_num:07d}"
-        user.username = user.user_id
-        user.save()
         return Response(
             {
                 "message": "User verified successfully.",
-                "new_user_id": user.user_id
+                "new_user_id": users[0].user_id
+            },
+            status=status.HTTP_200_OK,
+        )
+
+class BulkVerifyUserView(APIView):
+    """Verify up to MAX_USERS users at once: {"ids": [1, 2, ...]}."""
+    permission_classes = [IsAdminOrIsStaff]
+    MAX_USERS = 5000
+
+    def post(self, request):
+        ids = request.data.get("ids")
+        if not isinstance(ids, list) or not all(isinstance(pk, int) for pk in ids):
+            return Response({"error": "ids must be a list of user ids."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(ids) > self.MAX_USERS:
+            return Response({"error": f"At most {self.MAX_USERS} users per request."}, status=status.HTTP_400_BAD_REQUEST)
+
+        users, assigned = verify_users(ids)
+        assigned = {user.pk for user in assigned}
+        found = {user.pk for user in users}
+        return Response(
+            {
+                "verified": [{"id": user.pk, "user_id": user.user_id} for user in users if user.pk in assigned],
+                "already_verified": [{"id": user.pk, "user_id": user.user_id} for user in users if user.pk not in assigned],
+                "not_found": sorted(set(ids) - found),
+            },
+            status=status.HTTP_200_OK,
+        )
+
+class BulkUserUpdateView(APIView):
+    """
+    Set flags on many users at once and record it in the audit log. Users are
+    selected by {"ids": [...]} and/or {"filters": {...}} (the user list filters,
+    combined), flags given as {"changes": {"is_blocked": true, ...}}.
+    """
+    permission_classes = [IsAdminOrIsStaff]
+
+    def post(self, request):
+        ids = request.data.get("ids")
+        filters = request.data.get("filters")
+        if not ids and not filters:
+            return Response({"error": "Select users with ids or filters."}, status=status.HTTP_400_BAD_REQUEST)
+
+        users = User.objects.all()
+        if ids:
+            if not isinstance(ids, list) or not all(isinstance(pk, int) for pk in ids):
+                return Response({"error": "ids must be a list of user ids."}, status=status.HTTP_400_BAD_REQUEST)
+            users = users.filter(pk__in=ids)
+        if filters:
+            # Unknown filters would be ignored and select everyone: refuse them
+            if not isinstance(filters, dict) or set(filters) - set(USER_FILTER_FIELDS):
+                return Response(
+                    {"error": f"filters may only use: {', '.join(USER_FILTER_FIELDS)}."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            filterset = UserFilterSet(filters, queryset=users)
+            if not filterset.is_valid():
+                return Response(filterset.errors, status=status.HTTP_400_BAD_REQUEST)
+            users = filterset.qs
+
+        try:
+            results, log = bulk_update_users(
+                request.user, users, request.data.get("changes"), {"ids": ids or [], "filters": filters or {}},
+            )
+        except BulkUpdateError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(
+            {
+                "audit_id": log.pk,
+                "matched": len(results),
+                "updated": log.affected,
+                "results": results,
             },
             status=status.HTTP_200_OK,
         )
@@ -46,6 +46,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework_simplejwt',
     'corsheaders',
@@ -59,6 +60,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'dashboard.metrics.QueryMetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -178,6 +180,26 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing: PASSWORD_HASHER (pbkdf2, argon2, bcrypt or scrypt) hashes new
+# passwords and re-hashes others on login; the rest stay listed so existing hashes
+# verify. argon2 needs argon2-cffi, bcrypt needs bcrypt. Costs are measured with
+# `manage.py benchmark_auth`.
+PASSWORD_HASHER_CLASSES = {
+    'pbkdf2': 'account.hashers.PBKDF2PasswordHasher',
+    'argon2': 'account.hashers.Argon2PasswordHasher',
+    'bcrypt': 'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'scrypt': 'django.contrib.auth.hashers.ScryptPasswordHasher',
+}
+PASSWORD_HASHER = config('PASSWORD_HASHER', default='pbkdf2')
+PASSWORD_HASHERS = [
+    PASSWORD_HASHER_CLASSES[PASSWORD_HASHER],
+    *(path for name, path in PASSWORD_HASHER_CLASSES.items() if name != PASSWORD_HASHER),
+]
+PASSWORD_PBKDF2_ITERATIONS = config('PASSWORD_PBKDF2_ITERATIONS', default=1_000_000, cast=int)
+PASSWORD_ARGON2_TIME_COST = config('PASSWORD_ARGON2_TIME_COST', default=2, cast=int)
+PASSWORD_ARGON2_MEMORY_COST = config('PASSWORD_ARGON2_MEMORY_COST', default=102400, cast=int)
+PASSWORD_ARGON2_PARALLELISM = config('PASSWORD_ARGON2_PARALLELISM', default=8, cast=int)
+
 # Email backend (default uses SMTP)
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 
@@ -188,11 +210,44 @@ EMAIL_USE_TLS = config('EMAIL_USE_TLS')
 EMAIL_HOST_USER = config('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD')
 
-CELERY_BROKER_URL = 'redis://localhost:6379/0'
-CELERY_RESULT_BACKEND = 'redis://localhost:6379/0'
+# Queued mail (account.mail): messages per SMTP session, provider quota per minute
+# (0 = unpaced) and attempts before a message is marked failed
+EMAIL_BATCH_SIZE = config('EMAIL_BATCH_SIZE', default=50, cast=int)
+EMAIL_RATE_LIMIT = config('EMAIL_RATE_LIMIT', default=60, cast=int)
+EMAIL_MAX_ATTEMPTS = config('EMAIL_MAX_ATTEMPTS', default=5, cast=int)
+
+REDIS_URL = config('REDIS_URL', default='redis://localhost:6379/0')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': config('REDIS_CACHE_URL', default='redis://localhost:6379/1'),
+    }
+}
+
+CELERY_BROKER_URL = REDIS_URL
+CELERY_RESULT_BACKEND = REDIS_URL
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
+CELERY_BEAT_SCHEDULE = {
+    'flush-email-queue': {
+        'task': 'account.tasks.flush_email_queue',
+        'schedule': 60.0,
+    },
+    'refresh-user-counts': {
+        'task': 'dashboard.tasks.refresh_user_counts_task',
+        'schedule': 15 * 60.0,
+    },
+    'reconcile-payment-stats': {
+        'task': 'payment.tasks.reconcile_payment_stats_task',
+        'schedule': 24 * 60 * 60.0,
+    },
+    'flush-ad-stats': {
+        'task': 'vyapari.tasks.flush_ad_stats_task',
+        'schedule': 60.0,
+    },
+}
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
@@ -214,6 +269,41 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = 'api/media/'
 MEDIA_ROOT = BASE_DIR / 'mediafiles'
 
+# Rendered ID cards / certificates (not publicly served, see dashboard.document_store)
+DOCUMENT_STORE_ROOT = BASE_DIR / 'generated_documents'
+DOCUMENT_STORE_X_ACCEL_PREFIX = config('DOCUMENT_STORE_X_ACCEL_PREFIX', default='')
+# Render requested documents in Celery instead of the request (overridable per request)
+DOCUMENTS_ASYNC = config('DOCUMENTS_ASYNC', default=False, cast=bool)
+
+
+# Per-request query/time metrics (dashboard.metrics, off by default), scraped from /metrics with
+# an X-Metrics-Token header matching METRICS_TOKEN (the endpoint is off without one)
+QUERY_METRICS_ENABLED = config('QUERY_METRICS_ENABLED', default=False, cast=bool)
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+# Query budgets by "<METHOD> <url name>", url name or route; over-budget requests
+# are logged, or raise QueryBudgetExceeded with QUERY_BUDGET_ACTION=raise (tests)
+QUERY_BUDGET_DEFAULT = config('QUERY_BUDGET_DEFAULT', default=30, cast=int)
+QUERY_BUDGET_ACTION = config('QUERY_BUDGET_ACTION', default='log')
+# Budgets are the measured counts of an authenticated request (JWT auth loads the
+# user: anonymous requests run one query less); writes include their transaction
+QUERY_BUDGETS = {
+    'GET user_list': 3,
+    'GET dashboard': 1,
+    'GET user-count': 2,
+    'GET fuzzy-search': 2,
+    'GET payment-stats': 2,
+    'GET volunteer-list-create': 4,
+    'GET volunteer-detail': 3,
+    'GET application-list-create': 3,
+    'GET vyapari-list': 3,
+    'GET vyapari-nearby': 4,
+    'GET advertisement-serve': 2,
+    'POST advertisement-click': 1,
+    'POST verify_user': 8,
+    'POST bulk_verify_users': 8,
+    'POST bulk_update_users': 13,
+}
+
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
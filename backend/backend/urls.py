@@ -19,6 +19,8 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from dashboard.metrics import metrics_view
+
 urlpatterns = [
     path('adminpanel/', admin.site.urls),
     path('account/', include('account.urls')),
@@ -27,6 +29,7 @@ urlpatterns = [
     path('vyapari/', include('vyapari.urls')),
     path('volunteer/', include('volunteer.urls')),
     path('admin/', include('adminpanel.urls')),
+    path('metrics', metrics_view, name='metrics'),
 
 ]
 
@@ -0,0 +1,200 @@
+import multiprocessing
+import os
+import secrets
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+from django.db import connections
+from django.utils import timezone
+from PyPDF2 import PdfWriter
+
+from account.models import User
+from .document_store import storage
+from .documents import DOCUMENT_TEMPLATES, DocumentError, get_document_data, get_document_template, get_qr_text
+from .pdf_builder.utils.builder import add_document_pages, render_overlay
+
+
+BATCH_DIR = "batches"
+
+
+def user_document_queryset(doc_type, state=None, district=None, wing=None, user_ids=None):
+    """Users a batch run should generate `doc_type` for."""
+    users = User.objects.select_related("volunteer__designation").order_by("pk")
+    if doc_type == "certificate":
+        users = users.filter(is_volunteer=True)
+    elif doc_type == "welcome_letter":
+        users = users.filter(is_member_account=True)
+    if state:
+        users = users.filter(state__iexact=state)
+    if district:
+        users = users.filter(district__iexact=district)
+    if wing:
+        users = users.filter(volunteer__wing__name__iexact=wing)
+    if user_ids:
+        users = users.filter(user_id__in=user_ids)
+    return users
+
+
+def _build_payload(user, doc_type):
+    """Everything needed to render one document, as plain picklable values."""
+    try:
+        data = get_document_data(user, doc_type)
+    except DocumentError:
+        return None
+    image_path = user.image.path if user.image else None
+    return (user.user_id, doc_type, data, image_path, get_qr_text(user))
+
+
+def _render_payload(payload, compose):
+    """
+    Render one document. With compose=False only the overlay page is returned, for
+    outputs that stamp it onto a shared template themselves.
+    """
+    user_id, doc_type, data, image_path, qr_text = payload
+    template, plan = get_document_template(doc_type)
+    overlay = render_overlay(plan, template.width, template.height, data, image_file=image_path, qr_text=qr_text)
+    if not compose:
+        return user_id, overlay
+
+    writer = PdfWriter()
+    add_document_pages(writer, template, overlay)
+    pdf = BytesIO()
+    writer.write(pdf)
+    return user_id, pdf.getvalue()
+
+
+def _render_all(payloads, workers, compose):
+    """
+    Render payloads in order, keeping at most a few documents per worker in
+    flight so memory stays bounded however large the batch is.
+    """
+    if workers <= 1:
+        for payload in payloads:
+            yield _render_payload(payload, compose)
+        return
+
+    # Forked workers inherit the warmed template cache but must not share the
+    # parent's database connection, so fork them all before the queryset runs.
+    connections.close_all()
+    window = workers * 4
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork")) as pool:
+        pool.submit(int).result()
+        pending = deque()
+        for payload in payloads:
+            pending.append(pool.submit(_render_payload, payload, compose))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+class _ZipOutput:
+    """ZIP of complete per-user PDFs."""
+
+    compose = True
+
+    def __init__(self, base):
+        self.name = f"{base}.zip"
+        self.archive = zipfile.ZipFile(storage.path(self.name), "w", zipfile.ZIP_STORED)
+
+    def add(self, user_id, pdf_bytes):
+        self.archive.writestr(f"{user_id}.pdf", pdf_bytes)
+
+    def close(self):
+        self.archive.close()
+        return [self.name]
+
+
+class _MergedOutput:
+    """
+    Merged PDF, split into parts of `pages_per_file` pages to bound memory.
+
+    Workers only send overlays; stamping them onto the one cached template keeps
+    the template artwork in each part once instead of once per user.
+    """
+
+    compose = False
+
+    def __init__(self, base, doc_type, pages_per_file):
+        self.base = base
+        self.template = get_document_template(doc_type)[0]
+        self.pages_per_file = pages_per_file
+        self.files = []
+        self.writer = None
+
+    def add(self, user_id, overlay):
+        if self.writer is None:
+            self.writer = PdfWriter()
+        add_document_pages(self.writer, self.template, overlay)
+        if len(self.writer.pages) >= self.pages_per_file:
+            self._flush()
+
+    def _flush(self):
+        name = f"{self.base}-part{len(self.files) + 1:03d}.pdf"
+        with open(storage.path(name), "wb") as f:
+            self.writer.write(f)
+        self.files.append(name)
+        self.writer = None
+
+    def close(self):
+        if self.writer is not None:
+            self._flush()
+        return self.files
+
+
+def generate_batch(users, doc_type, output_format="zip", workers=1, pages_per_file=1000, progress=None):
+    """
+    Render `doc_type` for every user in the queryset and write the result to the
+    private document store, either as a ZIP of per-user PDFs or as merged
+    multi-page PDFs. Files are served through DocumentBatchDownloadView only.
+
+    Args:
+        users (QuerySet): Users to render, e.g. from user_document_queryset().
+        doc_type (str): Key of DOCUMENT_TEMPLATES.
+        output_format (str): "zip" or "pdf".
+        workers (int): Render processes. 1 renders in the current process.
+        pages_per_file (int): Page limit per merged PDF part.
+        progress (callable, optional): Called as progress(done, total).
+
+    Returns:
+        dict: {"files": [document store names], "generated": int, "skipped": int}
+    """
+    if doc_type not in DOCUMENT_TEMPLATES:
+        raise DocumentError("Unknown document type")
+
+    # Warm the template cache so forked workers inherit the parsed template.
+    get_document_template(doc_type)
+
+    os.makedirs(storage.path(BATCH_DIR), exist_ok=True)
+    # The random part keeps batch names unguessable
+    base = f"{BATCH_DIR}/{doc_type}-{timezone.now():%Y%m%d-%H%M%S}-{secrets.token_hex(8)}"
+    if output_format == "pdf":
+        output = _MergedOutput(base, doc_type, pages_per_file)
+    else:
+        output = _ZipOutput(base)
+
+    total = users.count()
+    skipped = 0
+
+    def payloads():
+        nonlocal skipped
+        for user in users.iterator(chunk_size=500):
+            payload = _build_payload(user, doc_type)
+            if payload is None:
+                skipped += 1
+                continue
+            yield payload
+
+    generated = 0
+    try:
+        for user_id, rendered in _render_all(payloads(), workers, output.compose):
+            output.add(user_id, rendered)
+            generated += 1
+            if progress:
+                progress(generated + skipped, total)
+    finally:
+        files = output.close()
+
+    return {"files": files, "generated": generated, "skipped": skipped}
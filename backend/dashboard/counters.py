@@ -0,0 +1,63 @@
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from account.models import User
+
+
+# -------------------------------
+# User counters
+# -------------------------------
+#
+# The dashboard's user counts are kept in the cache, one key per counter, so they
+# can be adjusted atomically with cache.incr() by the User signals (see
+# signals.py) instead of counting the table on every dashboard load. A missing
+# counter triggers a single recount; celery beat also recounts periodically to
+# correct drift from writes that bypass signals (QuerySet.update, raw SQL).
+
+# counter name -> User flag it counts ("total_user" counts every user)
+USER_COUNT_FLAGS = {
+    "verified_user": "is_verified",
+    "member_user": "is_member_account",
+    "volunteer_user": "is_volunteer",
+    "business_user": "is_business_account",
+    "staff_user": "is_staff_account",
+    "admin_user": "is_admin_account",
+    "blocked_user": "is_blocked",
+}
+USER_COUNTERS = ["total_user", *USER_COUNT_FLAGS]
+
+CACHE_PREFIX = "dashboard:user-count:"
+
+
+def count_users():
+    """Count all users per flag in one conditional-aggregation query."""
+    return User.objects.aggregate(
+        total_user=Count("pk"),
+        **{name: Count("pk", filter=Q(**{flag: True})) for name, flag in USER_COUNT_FLAGS.items()},
+    )
+
+
+def refresh_user_counts():
+    counts = count_users()
+    cache.set_many({CACHE_PREFIX + name: value for name, value in counts.items()}, timeout=None)
+    return counts
+
+
+def get_user_counts():
+    """Return the user counters, recounting only if the cache doesn't hold them all."""
+    cached = cache.get_many([CACHE_PREFIX + name for name in USER_COUNTERS])
+    if len(cached) < len(USER_COUNTERS):
+        return refresh_user_counts()
+    return {name: cached[CACHE_PREFIX + name] for name in USER_COUNTERS}
+
+
+def adjust_user_counts(deltas):
+    """Apply {counter name: delta} to the cached counters."""
+    for name, delta in deltas.items():
+        if not delta:
+            continue
+        try:
+            cache.incr(CACHE_PREFIX + name, delta)
+        except ValueError:
+            # Not cached; the next read recounts anyway
+            pass
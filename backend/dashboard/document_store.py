@@ -0,0 +1,121 @@
+import hashlib
+import json
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.http import FileResponse, HttpResponse
+
+from .documents import DOCUMENT_TEMPLATES, get_document_data, get_qr_text, render_document
+from .pdf_builder.utils.templates import LAYOUT_VERSION
+
+
+# -------------------------------
+# Generated-document store
+# -------------------------------
+#
+# Rendered PDFs are stored under a key hashed from everything that affects the
+# output: template file, layout version, text fields, QR text and photo (name,
+# size and mtime). The same
+# inputs always map to the same file, so a hit never needs re-rendering and a
+# changed input simply misses. Files live outside MEDIA_ROOT (which is served
+# publicly) and are grouped per user so they can be removed when the user changes.
+
+STORE_DIR = "documents"
+
+storage = FileSystemStorage(location=settings.DOCUMENT_STORE_ROOT)
+
+
+@lru_cache(maxsize=None)
+def _template_checksum(template_path):
+    with open(template_path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _photo_version(photo):
+    """
+    Identify the photo by name, size and modification time: cheap stat calls
+    instead of reading the whole file on every document request. A replaced
+    photo gets a new upload name or a new mtime either way.
+    """
+    if not photo:
+        return None
+    photo_storage = photo.storage
+    return [photo.name, photo_storage.size(photo.name), photo_storage.get_modified_time(photo.name).timestamp()]
+
+
+def document_key(doc_type, data, photo=None, qr_text=None):
+    template_path, _ = DOCUMENT_TEMPLATES[doc_type]
+    payload = json.dumps({
+        "document_type": doc_type,
+        "template": _template_checksum(template_path),
+        "layout_version": LAYOUT_VERSION,
+        "data": data,
+        "qr": qr_text,
+        "photo": _photo_version(photo),
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _user_dir(user_pk):
+    return f"{STORE_DIR}/{user_pk}"
+
+
+def get_user_document(user, doc_type):
+    """
+    Return the store path of the user's document, rendering it on a miss.
+    Raises DocumentError for invalid requests.
+    """
+    data = get_document_data(user, doc_type)
+    photo = user.image if user.image else None
+    qr_text = get_qr_text(user)
+
+    name = f"{_user_dir(user.pk)}/{doc_type}-{document_key(doc_type, data, photo, qr_text)[:32]}.pdf"
+    if not storage.exists(name):
+        pdf = render_document(doc_type, data, image_file=photo, qr_text=qr_text)
+        saved = storage.save(name, ContentFile(pdf.getvalue()))
+        if saved != name:
+            # Another request rendered the same document meanwhile.
+            storage.delete(saved)
+    return name
+
+
+def document_exists(name):
+    return storage.exists(name)
+
+
+def read_document(name):
+    with storage.open(name, "rb") as f:
+        return f.read()
+
+
+def invalidate_user_documents(user_pk):
+    """Delete every stored document of a user."""
+    directory = _user_dir(user_pk)
+    try:
+        _, files = storage.listdir(directory)
+    except FileNotFoundError:
+        return
+    for filename in files:
+        storage.delete(f"{directory}/{filename}")
+
+
+def serve_document(name, filename, content_type="application/pdf"):
+    """
+    Stream a stored document. When DOCUMENT_STORE_X_ACCEL_PREFIX is set (an
+    nginx `internal` location aliased to DOCUMENT_STORE_ROOT), nginx sends the
+    file and the worker returns immediately.
+    """
+    prefix = settings.DOCUMENT_STORE_X_ACCEL_PREFIX
+    if prefix:
+        response = HttpResponse(content_type=content_type)
+        response["X-Accel-Redirect"] = f"{prefix.rstrip('/')}/{name}"
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+    return FileResponse(
+        storage.open(name, "rb"),
+        as_attachment=True,
+        filename=filename,
+        content_type=content_type,
+    )
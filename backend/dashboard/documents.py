@@ -0,0 +1,93 @@
+import os
+from django.conf import settings
+
+from .pdf_builder.utils.builder import generate_pdf
+from .pdf_builder.utils.derivatives import MASKED_SHAPES, generate_derivatives
+from .pdf_builder.utils.plans import get_render_plan
+from .pdf_builder.utils.template_cache import get_template
+from .pdf_builder.utils.templates import ID_CARD_LAYOUT, CERTIFICATE_LAYOUT, JOINING_LETTER_LAYOUT
+
+
+TEMPLATES_DIR = os.path.join(settings.BASE_DIR, "dashboard", "pdf_builder", "templates", "documents")
+
+# document_type -> (template path, layout)
+DOCUMENT_TEMPLATES = {
+    "idcard": (os.path.join(TEMPLATES_DIR, "id_card.pdf"), ID_CARD_LAYOUT),
+    "certificate": (os.path.join(TEMPLATES_DIR, "niyukti.pdf"), CERTIFICATE_LAYOUT),
+    "welcome_letter": (os.path.join(TEMPLATES_DIR, "member_welcome_letter.pdf"), JOINING_LETTER_LAYOUT),
+}
+
+
+class DocumentError(Exception):
+    """Raised when a document can't be generated for a user."""
+
+
+def get_document_template(doc_type):
+    """Return the cached template and compiled render plan for a document type."""
+    template_path, layout = DOCUMENT_TEMPLATES[doc_type]
+    plan = get_render_plan(layout)
+    return get_template(template_path, plan.scaling), plan
+
+
+def photo_image_plans():
+    """Distinct masked image plans across all documents, i.e. the photo derivatives to prepare."""
+    plans = {get_render_plan(layout).image for _, layout in DOCUMENT_TEMPLATES.values()}
+    return [plan for plan in plans if plan and plan.shape in MASKED_SHAPES]
+
+
+def generate_photo_derivatives(photo):
+    """Prepare the derivatives every document needs for an uploaded photo."""
+    if not photo:
+        return []
+    return generate_derivatives(photo, photo_image_plans())
+
+
+def get_qr_text(user):
+    return f"{settings.FRONTEND_URL}/idcard-verify/{user.user_id}"
+
+
+def get_document_data(user, doc_type):
+    """Collect the text fields for a user's document."""
+    if doc_type == "idcard":
+        return {
+            "name": user.name,
+            "reg_no": f'{user.user_id}',
+            "in": user.volunteer.designation if user.is_volunteer else "Member",
+            "mob": user.phone,
+            "date": user.volunteer.joined_date.strftime("%d-%m-%Y") if user.is_volunteer else user.date_joined.strftime("%d-%m-%Y"),
+            "block": f'{user.blood_group}',
+            "district": user.district,
+            "state": user.state,
+        }
+    if doc_type == "certificate":
+        if not user.is_volunteer:
+            raise DocumentError("User is not a volunteer")
+        return {
+            "name": user.volunteer.hindi_name if user.volunteer.hindi_name else user.name,
+            "reg_no": f'{user.user_id}',
+            "reg_date": user.volunteer.joined_date.strftime("%d-%m-%Y"),
+            "valid_till": user.volunteer.joined_date.replace(year=user.volunteer.joined_date.year + 1).strftime("%d-%m-%Y"),
+        }
+    if doc_type == "welcome_letter":
+        if not user.is_member_account:
+            raise DocumentError("User is not a member")
+        return {
+            "name": user.name,
+            "address": f'{user.city}, {user.district}, {user.state}',
+            "joining_date": user.date_joined.strftime("%d-%m-%Y"),
+            "reg_no": f'{user.user_id}',
+        }
+    raise DocumentError("Unknown document type")
+
+
+def render_document(doc_type, data, image_file=None, qr_text=None):
+    """Render a document from already collected data. Returns a BytesIO."""
+    template_path, layout = DOCUMENT_TEMPLATES[doc_type]
+    return generate_pdf(template_path, data, document_type=doc_type, layout=layout, image_file=image_file, qr_text=qr_text)
+
+
+def generate_user_document(user, doc_type):
+    """Render one of the user's documents. Raises DocumentError for invalid requests."""
+    data = get_document_data(user, doc_type)
+    photo = user.image if user.image else None
+    return render_document(doc_type, data, image_file=photo, qr_text=get_qr_text(user))
@@ -1,4 +1,5 @@
 import django_filters
+from django.utils.dateparse import parse_date
 from payment.models import Payment
 
 class PaymentFilter(django_filters.FilterSet):
@@ -9,3 +10,14 @@ class PaymentFilter(django_filters.FilterSet):
     class Meta:
         model = Payment
         fields = ['status', 'payment_for', 'date']
+
+
+def query_date(request, name):
+    """Date from the ?<name>=YYYY-MM-DD query parameter, or None. Raises ValueError if invalid."""
+    value = request.query_params.get(name)
+    if not value:
+        return None
+    parsed = parse_date(value)
+    if parsed is None:
+        raise ValueError(value)
+    return parsed
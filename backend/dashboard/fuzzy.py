@@ -0,0 +1,185 @@
+import threading
+import time
+from itertools import chain
+
+import numpy as np
+from django.core.cache import cache
+from rapidfuzz import fuzz, process
+
+from account.models import User
+from vyapari.models import Vyapari
+from .models import District, State
+
+
+# -------------------------------
+# Fuzzy name search
+# -------------------------------
+#
+# Each FuzzyIndex keeps one corpus of names (Vyapari names, user names, districts,
+# states) in memory per worker, normalized once, and matches queries against it
+# with RapidFuzz:
+#   1. every query word is scored against the corpus vocabulary in one vectorized
+#      process.cdist call, so the cost grows with distinct words, not entries;
+#   2. entries are scored by their best-matching word per query word, summed
+#      through a CSR (offsets/postings) array of word -> entries;
+#   3. the top candidates are re-ranked with WRatio on the full name.
+# Changes bump a version number in the shared cache (see
+# signals.py); a worker notices the new version on its next search and rebuilds,
+# at most once per REBUILD_INTERVAL so bursts of writes don't cause rebuild storms.
+
+REBUILD_INTERVAL = 30
+DEFAULT_SCORE_CUTOFF = 60
+WORD_SCORE_CUTOFF = 60
+# Candidates re-ranked with WRatio per requested result
+CANDIDATES_PER_RESULT = 5
+
+
+def normalize(text):
+    # rapidfuzz's default_process drops non-alphanumerics, which would strip
+    # Devanagari vowel signs, so only casefold and collapse whitespace.
+    return " ".join(str(text).casefold().split())
+
+
+class FuzzyIndex:
+    def __init__(self, name, loader):
+        """
+        Args:
+            name (str): Corpus name, also used for the version cache key.
+            loader (callable): Returns an iterable of (id, name, extra dict).
+        """
+        self.name = name
+        self.loader = loader
+        self._lock = threading.Lock()
+        self._entries = None  # _Entries
+        self._version = None
+        self._built_at = 0.0
+
+    @property
+    def version_key(self):
+        return f"fuzzy:{self.name}:version"
+
+    def mark_changed(self):
+        """Tell every worker to rebuild this index."""
+        try:
+            cache.incr(self.version_key)
+        except ValueError:
+            cache.set(self.version_key, 1, timeout=None)
+
+    def _current_entries(self):
+        version = cache.get(self.version_key, 0)
+        stale = self._entries is None or (
+            version != self._version and time.monotonic() - self._built_at >= REBUILD_INTERVAL
+        )
+        if stale:
+            with self._lock:
+                if self._entries is None or version != self._version:
+                    self._build(version)
+        return self._entries
+
+    def _build(self, version):
+        choices, ids, labels, extras = [], [], [], []
+        for pk, label, extra in self.loader():
+            if not label:
+                continue
+            choices.append(normalize(label))
+            ids.append(pk)
+            labels.append(label)
+            extras.append(extra)
+        self._entries = _Entries(choices, ids, labels, extras)
+        self._version = version
+        self._built_at = time.monotonic()
+
+    def search(self, query, limit=10, score_cutoff=DEFAULT_SCORE_CUTOFF):
+        """Return up to `limit` matches as dicts with id, name, score and any extras."""
+        entries = self._current_entries()
+        query = normalize(query)
+        if not query or not entries.choices:
+            return []
+
+        candidates = entries.candidates(query, limit * CANDIDATES_PER_RESULT)
+        matches = process.extract(
+            query,
+            {i: entries.choices[i] for i in candidates},
+            scorer=fuzz.WRatio,
+            processor=None,
+            limit=limit,
+            score_cutoff=score_cutoff,
+        )
+        return [entries.match(i, score) for _, score, i in matches]
+
+
+class _Entries:
+    """An immutable corpus snapshot with its word index."""
+
+    def __init__(self, choices, ids, labels, extras):
+        self.choices = choices
+        self.ids = ids
+        self.labels = labels
+        self.extras = extras
+
+        # word -> entries, as CSR arrays: entries of word w are
+        # postings[offsets[w]:offsets[w + 1]]
+        words = {}
+        word_entries = []
+        for i, choice in enumerate(choices):
+            for word in set(choice.split()):
+                w = words.setdefault(word, len(words))
+                if w == len(word_entries):
+                    word_entries.append([])
+                word_entries[w].append(i)
+        self.vocabulary = list(words)
+        self.offsets = np.zeros(len(word_entries) + 1, dtype=np.int64)
+        np.cumsum([len(e) for e in word_entries], out=self.offsets[1:])
+        self.postings = np.fromiter(chain.from_iterable(word_entries), dtype=np.int32, count=int(self.offsets[-1]))
+
+    def match(self, i, score):
+        return {"id": self.ids[i], "name": self.labels[i], "score": round(score, 1), **self.extras[i]}
+
+    def candidates(self, query, count):
+        """Indexes of the `count` entries whose words best match the query's words."""
+        words = query.split()
+        similarity = process.cdist(
+            words, self.vocabulary, scorer=fuzz.ratio, processor=None,
+            score_cutoff=WORD_SCORE_CUTOFF, dtype=np.uint8, workers=-1,
+        )
+        totals = np.zeros(len(self.choices), dtype=np.float32)
+        for row in similarity:
+            matched = np.flatnonzero(row)
+            if not len(matched):
+                continue
+            starts, ends = self.offsets[matched], self.offsets[matched + 1]
+            entries = np.concatenate([self.postings[a:b] for a, b in zip(starts, ends)])
+            best = np.zeros(len(self.choices), dtype=np.uint8)
+            np.maximum.at(best, entries, np.repeat(row[matched], ends - starts))
+            totals += best
+
+        found = np.flatnonzero(totals)
+        if len(found) > count:
+            found = found[np.argpartition(-totals[found], count)[:count]]
+        return found.tolist()
+
+
+def _vyaparis():
+    return ((pk, name, {}) for pk, name in Vyapari.objects.values_list('pk', 'name').iterator(chunk_size=2000))
+
+
+def _users():
+    users = User.objects.exclude(name__isnull=True).exclude(name='').values_list('pk', 'name', 'user_id')
+    return ((pk, name, {"user_id": user_id}) for pk, name, user_id in users.iterator(chunk_size=2000))
+
+
+def _districts():
+    districts = District.objects.values_list('pk', 'name', 'state__name')
+    return ((pk, name, {"state": state}) for pk, name, state in districts.iterator(chunk_size=2000))
+
+
+def _states():
+    return ((pk, name, {}) for pk, name in State.objects.values_list('pk', 'name'))
+
+
+FUZZY_INDEXES = {
+    "vyapari": FuzzyIndex("vyapari", _vyaparis),
+    "user": FuzzyIndex("user", _users),
+    "district": FuzzyIndex("district", _districts),
+    "state": FuzzyIndex("state", _states),
+}
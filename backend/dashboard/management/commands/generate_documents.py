@@ -0,0 +1,53 @@
+import os
+import time
+from django.core.management.base import BaseCommand
+
+from dashboard.batch import generate_batch, user_document_queryset
+from dashboard.document_store import storage
+from dashboard.documents import DOCUMENT_TEMPLATES
+
+
+class Command(BaseCommand):
+    help = 'Generate ID cards, certificates or welcome letters for many users into the private document store (DOCUMENT_STORE_ROOT)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('document_type', choices=sorted(DOCUMENT_TEMPLATES), help='Document to generate')
+        parser.add_argument('--state', help='Only users in this state')
+        parser.add_argument('--district', help='Only users in this district')
+        parser.add_argument('--wing', help='Only volunteers of this wing')
+        parser.add_argument('--user-id', nargs='+', dest='user_ids', help='Only these registration IDs')
+        parser.add_argument('--format', choices=['zip', 'pdf'], default='zip', dest='output_format',
+                            help='ZIP of per-user PDFs, or merged multi-page PDF parts')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Render processes')
+        parser.add_argument('--pages-per-file', type=int, default=1000, help='Pages per merged PDF part')
+
+    def handle(self, *args, **kwargs):
+        doc_type = kwargs['document_type']
+        users = user_document_queryset(
+            doc_type,
+            state=kwargs['state'],
+            district=kwargs['district'],
+            wing=kwargs['wing'],
+            user_ids=kwargs['user_ids'],
+        )
+        started = time.monotonic()
+
+        def progress(done, total):
+            if done % 100 == 0 or done == total:
+                rate = done / max(time.monotonic() - started, 1e-6)
+                self.stdout.write(f"{done}/{total} documents ({rate:.1f}/s)")
+
+        result = generate_batch(
+            users,
+            doc_type,
+            output_format=kwargs['output_format'],
+            workers=kwargs['workers'],
+            pages_per_file=kwargs['pages_per_file'],
+            progress=progress,
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Generated {result['generated']} documents ({result['skipped']} skipped)"
+        ))
+        for name in result['files']:
+            self.stdout.write(f"  {storage.path(name)}")
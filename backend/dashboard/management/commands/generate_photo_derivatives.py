@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from account.models import User
+from dashboard.documents import generate_photo_derivatives
+from volunteer.models import Application, Volunteer
+
+
+class Command(BaseCommand):
+    help = 'Generate missing document photo derivatives for already uploaded photos'
+
+    def handle(self, *args, **kwargs):
+        for model in (User, Volunteer, Application):
+            created = 0
+            photos = model.objects.exclude(image='').exclude(image__isnull=True).only('pk', 'image')
+            for instance in photos.iterator(chunk_size=500):
+                try:
+                    created += len(generate_photo_derivatives(instance.image))
+                except (OSError, ValueError) as e:
+                    self.stdout.write(self.style.WARNING(f"{model.__name__} {instance.pk}: {e}"))
+            self.stdout.write(f"{model.__name__}: {created} derivatives created")
+        self.stdout.write(self.style.SUCCESS("✅ Done"))
@@ -1,83 +1,67 @@
-import pandas as pd
-from django.core.management.base import BaseCommand
-from django.contrib.auth import get_user_model
-from datetime import datetime
+import json
+import os
+import time
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard.member_import import import_members
 
-User = get_user_model()
 
 class Command(BaseCommand):
-    help = 'Import RSS India members from Excel and set DOB as password'
+    help = (
+        'Import RSS India members from an Excel (.xlsx) or CSV sheet and set DOB as password. '
+        'Progress is checkpointed after every batch; rerunning resumes where it stopped'
+    )
 
     def add_arguments(self, parser):
-        parser.add_argument('excel_path', type=str, help='Path to the Excel file')
+        parser.add_argument('excel_path', type=str, help='Path to the Excel or CSV file')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per transaction')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Password hashing processes')
+        parser.add_argument('--checkpoint', help='Checkpoint file (default: <excel_path>.checkpoint)')
+        parser.add_argument('--restart', action='store_true', help='Ignore an existing checkpoint')
 
     def handle(self, *args, **kwargs):
-        excel_path = kwargs['excel_path']
-        df = pd.read_excel(excel_path)
-
-        # Clean up column names
-        df.columns = [str(c).strip().upper() for c in df.columns]
+        path = kwargs['excel_path']
+        if not os.path.isfile(path):
+            raise CommandError(f"No such file: {path}")
+        checkpoint_path = kwargs['checkpoint'] or f"{path}.checkpoint"
+        source = self._source(path)
 
-        def safe_date(val):
-            """Safely parse date formats"""
-            if pd.isna(val):
-                return None
-            if isinstance(val, datetime):
-                return val.date()
-            for fmt in ("%d/%m/%Y", "%Y-%m-%d", "%d-%m-%Y"):
-                try:
-                    return datetime.strptime(str(val), fmt).date()
-                except Exception:
-                    continue
-            return None
+        start = 0
+        if os.path.exists(checkpoint_path) and not kwargs['restart']:
+            with open(checkpoint_path) as f:
+                checkpoint = json.load(f)
+            if checkpoint.get('source') != source:
+                raise CommandError(f"{checkpoint_path} belongs to a different or changed file; use --restart")
+            start = checkpoint['rows']
+            self.stdout.write(f"Resuming after row {start}")
 
-        for _, row in df.iterrows():
-            reg_id = str(row.get('REG ID', '')).strip()
-            if not reg_id or reg_id.lower() == 'nan':
-                continue
-            user_id = reg_id
-            name = str(row.get('NAME', '')).strip()
-            gender = str(row.get('GENDER', '')).strip()
-            mobile = str(row.get('MOBILE NO', '')).strip()
-            dob = safe_date(row.get('DOB'))
-            profession = str(row.get('PROFESSION', '')).strip()
-            city = str(row.get('VILLAGE / CITY', '')).strip()
-            tehsil = str(row.get('TEHSIL', '')).strip()
-            district = str(row.get('DISTRICT', '')).strip()
-            state = str(row.get('STATE', '')).strip()
-            pin = str(row.get('PIN CODE', '')).strip()
-            status = str(row.get('STATUS', '')).strip()
+        totals = dict.fromkeys(('created', 'updated', 'unchanged', 'without_id', 'duplicates'), 0)
+        started = time.monotonic()
+        done = start
+        for batch in import_members(path, start=start, batch_size=kwargs['batch_size'], workers=kwargs['workers']):
+            done = batch.pop('rows')
+            for name, count in batch.items():
+                totals[name] += count
+            self._save_checkpoint(checkpoint_path, source, done)
+            rate = (done - start) / max(time.monotonic() - started, 1e-6)
+            self.stdout.write(f"{done} rows ({rate:.0f} rows/s): " + ", ".join(f"{count} {name.replace('_', ' ')}" for name, count in totals.items()))
 
-            email = f"{reg_id.lower()}@rssindia.org"
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Imported {done - start} rows in {elapsed:.1f}s: {totals['created']} created, "
+            f"{totals['updated']} updated, {totals['unchanged']} unchanged, {totals['without_id']} without REG ID, "
+            f"{totals['duplicates']} repeated REG IDs"
+        ))
 
-            user, created = User.objects.get_or_create(
-                user_id=reg_id,
-                defaults={
-                    'user_id': user_id,
-                    'username': email,
-                    'email': email,
-                    'name': name,
-                    'gender': gender,
-                    'phone': mobile,
-                    'dob': dob,
-                    'profession': profession,
-                    'city': city,
-                    'sub_district': tehsil,
-                    'district': district,
-                    'state': state,
-                    'postal_code': pin,
-                    'is_member_account': True,
-                    'is_verified': status.lower() in ['approved', 'active', 'verified'],
-                }
-            )
+    def _source(self, path):
+        """Identifies the file a checkpoint was written for."""
+        stat = os.stat(path)
+        return {'path': os.path.abspath(path), 'size': stat.st_size, 'mtime': stat.st_mtime}
 
-            if created:
-                # Set password from DOB if available
-                if dob:
-                    user.set_password(dob.strftime("%d%m%Y"))
-                else:
-                    user.set_password("rss@12345")  # fallback if DOB missing
-                user.save()
-                self.stdout.write(self.style.SUCCESS(f"✅ Created user: {name} ({reg_id})"))
-            else:
-                self.stdout.write(f"ℹ️ User already exists: {reg_id}")
+    def _save_checkpoint(self, checkpoint_path, source, rows):
+        temporary = f"{checkpoint_path}.tmp"
+        with open(temporary, 'w') as f:
+            json.dump({'source': source, 'rows': rows}, f)
+        os.replace(temporary, checkpoint_path)
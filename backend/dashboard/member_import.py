@@ -0,0 +1,218 @@
+import csv
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+from itertools import islice
+
+import pandas as pd
+from django.contrib.auth.hashers import make_password
+from django.db import connections, transaction
+from openpyxl import load_workbook
+
+from account.identifiers import mark_identifiers_changed
+from account.models import User
+from account.registration import REGISTRATION_COUNTER, REGISTRATION_ID_RE, advance_counter
+from .counters import refresh_user_counts
+from .document_store import invalidate_user_documents
+from .fuzzy import FUZZY_INDEXES
+from .signals import DOCUMENT_USER_FIELDS
+
+
+# -------------------------------
+# Member import
+# -------------------------------
+#
+# Members are read from an .xlsx (openpyxl read-only mode, row by row) or .csv
+# sheet and written in batches, each in its own transaction: one query finds
+# which registration IDs already exist, unchanged rows are dropped, and the rest
+# go to one INSERT ... ON CONFLICT (user_id) DO UPDATE (bulk_create with
+# update_conflicts). Existing users keep their password, email and verification;
+# only their profile columns are updated. New users get their date of birth
+# (DDMMYYYY) as password, else DEFAULT_PASSWORD, hashed across a process pool
+# since one hash costs as much as the rest of the row.
+#
+# bulk_create sends no signals: each batch invalidates the documents of changed
+# users and moves the registration ID counter past imported IDs, and the end of
+# the import recounts the dashboard counters and refreshes the login and fuzzy
+# search indexes.
+
+DEFAULT_PASSWORD = "rss@12345"
+DATE_FORMATS = ("%d/%m/%Y", "%Y-%m-%d", "%d-%m-%Y")
+VERIFIED_STATUSES = {"approved", "active", "verified"}
+
+# sheet column -> User field
+COLUMNS = {
+    'NAME': 'name',
+    'GENDER': 'gender',
+    'MOBILE NO': 'phone',
+    'PROFESSION': 'profession',
+    'VILLAGE / CITY': 'city',
+    'TEHSIL': 'sub_district',
+    'DISTRICT': 'district',
+    'STATE': 'state',
+    'PIN CODE': 'postal_code',
+}
+# Fields updated on users that already exist
+UPDATE_FIELDS = [*COLUMNS.values(), 'dob', 'is_member_account']
+TEXT_FIELDS = set(COLUMNS.values())
+
+
+def read_rows(path):
+    """Data rows of the sheet as {upper-cased header: value} dicts, streamed."""
+    if str(path).lower().endswith('.csv'):
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            rows = csv.reader(f)
+            header = [str(c).strip().upper() for c in next(rows, [])]
+            for row in rows:
+                yield dict(zip(header, row))
+        return
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(c).strip().upper() for c in next(rows, ())]
+        for row in rows:
+            yield dict(zip(header, row))
+    finally:
+        workbook.close()
+
+
+def _text(value):
+    if value is None:
+        return ''
+    # Numeric cells (mobile numbers, PIN codes) come back as int or float
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def parse_dates(values):
+    """Dates of a column: date/datetime cells as they are, text in any DATE_FORMATS, else None."""
+    values = pd.Series(list(values), dtype=object)
+    is_date = values.map(lambda v: isinstance(v, (date, datetime)))
+    parsed = pd.to_datetime(values.where(is_date), errors='coerce')
+    text = values.where(~is_date).map(_text, na_action='ignore')
+    for fmt in DATE_FORMATS:
+        parsed = parsed.fillna(pd.to_datetime(text, format=fmt, errors='coerce'))
+    return [None if pd.isna(value) else value.date() for value in parsed]
+
+
+def _comparable(field, value):
+    # Blank text columns are stored as '' or NULL alike
+    if field in TEXT_FIELDS:
+        return value or None
+    return value
+
+
+def _password(dob):
+    return dob.strftime("%d%m%Y") if dob else DEFAULT_PASSWORD
+
+
+def _hash_passwords(passwords, pool):
+    if pool is None:
+        return [make_password(password) for password in passwords]
+    return list(pool.map(make_password, passwords, chunksize=64))
+
+
+def _write_batch(rows, pool):
+    """
+    Upsert one batch of sheet rows. Returns counts of
+    (created, updated, unchanged, without_id, duplicates).
+    """
+    members = {}
+    without_id = 0
+    for row, dob in zip(rows, parse_dates(row.get('DOB') for row in rows)):
+        reg_id = _text(row.get('REG ID'))
+        if not reg_id:
+            without_id += 1
+            continue
+        member = {field: _text(row.get(column)) or None for column, field in COLUMNS.items()}
+        member.update(dob=dob, is_member_account=True)
+        member['is_verified'] = _text(row.get('STATUS')).lower() in VERIFIED_STATUSES
+        # A repeated ID would hit the same row twice in one upsert: the last one wins
+        members[reg_id] = member
+    duplicates = len(rows) - without_id - len(members)
+
+    existing = {
+        values[0]: (values[1], values[2:])
+        for values in User.objects.filter(user_id__in=members).values_list('user_id', 'pk', *UPDATE_FIELDS)
+    }
+    new_ids = [reg_id for reg_id in members if reg_id not in existing]
+    changed = {}
+    for reg_id, (pk, current) in existing.items():
+        fields = {
+            field for field, old in zip(UPDATE_FIELDS, current)
+            if _comparable(field, members[reg_id][field]) != _comparable(field, old)
+        }
+        if fields:
+            changed[reg_id] = (pk, fields)
+
+    hashed = dict(zip(new_ids, _hash_passwords([_password(members[reg_id]['dob']) for reg_id in new_ids], pool)))
+    users = []
+    for reg_id in [*new_ids, *changed]:
+        email = f"{reg_id.lower()}@rssindia.org"
+        users.append(User(
+            user_id=reg_id,
+            username=email,
+            email=email,
+            # Only used for new users: existing ones keep theirs
+            password=hashed.get(reg_id, ''),
+            **members[reg_id],
+        ))
+
+    documents = [pk for pk, fields in changed.values() if DOCUMENT_USER_FIELDS.intersection(fields)]
+    numbers = [int(reg_id[1:]) for reg_id in new_ids if REGISTRATION_ID_RE.fullmatch(reg_id)]
+    with transaction.atomic():
+        if users:
+            User.objects.bulk_create(
+                users, update_conflicts=True, unique_fields=['user_id'], update_fields=UPDATE_FIELDS,
+            )
+        if numbers:
+            advance_counter(REGISTRATION_COUNTER, max(numbers))
+        transaction.on_commit(lambda: _invalidate_documents(documents))
+    return len(new_ids), len(changed), len(existing) - len(changed), without_id, duplicates
+
+
+def _invalidate_documents(pks):
+    for pk in pks:
+        invalidate_user_documents(pk)
+
+
+def import_members(path, start=0, batch_size=1000, workers=1):
+    """
+    Import the members of an .xlsx or .csv sheet, skipping its first `start`
+    data rows (already imported). Yields after each committed batch:
+
+        {"rows": data rows done, including start, "created": int,
+         "updated": int, "unchanged": int, "without_id": int, "duplicates": int}
+
+    with counts for this batch. Rows without a REG ID are skipped, and of rows
+    repeating a REG ID within a batch only the last is imported.
+    """
+    pool = None
+    if workers > 1:
+        # Fork the hashing workers before any query: they must not share the
+        # parent's database connection
+        connections.close_all()
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork"))
+        pool.submit(int).result()
+
+    written = False
+    rows = islice(read_rows(path), start, None)
+    done = start
+    try:
+        while batch := list(islice(rows, batch_size)):
+            created, updated, unchanged, without_id, duplicates = _write_batch(batch, pool)
+            written = written or bool(created or updated)
+            done += len(batch)
+            yield {
+                "rows": done, "created": created, "updated": updated, "unchanged": unchanged,
+                "without_id": without_id, "duplicates": duplicates,
+            }
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        if written:
+            refresh_user_counts()
+            mark_identifiers_changed()
+            FUZZY_INDEXES['user'].mark_changed()
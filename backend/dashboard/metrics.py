@@ -0,0 +1,257 @@
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+
+import redis
+from django.conf import settings
+from django.db import connections
+from django.http import Http404, HttpResponse
+from django.utils.crypto import constant_time_compare
+
+logger = logging.getLogger(__name__)
+
+
+# -------------------------------
+# Request metrics and query budgets
+# -------------------------------
+#
+# QueryMetricsMiddleware wraps every database connection for the duration of a
+# request (connection.execute_wrapper) to count queries and time them, times the
+# response render (DRF's JSON serialization) and measures the response size.
+# With QUERY_METRICS_ENABLED the numbers are added up in-process and pushed every
+# FLUSH_INTERVAL seconds, in one pipeline, to a Redis hash shared by all workers,
+# one field per (route, method, status class, metric), and exported in the
+# Prometheus text format by metrics_view at /metrics. So
+# requests never wait on Redis, except the one that pushes; while Redis is
+# unreachable, pushes are retried every FAILURE_BACKOFF seconds and the numbers
+# keep adding up in the meantime. A worker's last unpushed interval is lost when
+# it exits.
+#
+# Each request's query count is checked against its budget: QUERY_BUDGETS keyed
+# by "<METHOD> <url name>", url name, "<METHOD> <route>" or route (first match),
+# else QUERY_BUDGET_DEFAULT (None for no budget). Over-budget requests are counted,
+# and logged or, with QUERY_BUDGET_ACTION = "raise" (tests), fail with
+# QueryBudgetExceeded. Budgets are checked whether or not metrics are recorded.
+
+METRICS_KEY = "metrics:http"
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+UNMATCHED_ROUTE = "<unmatched>"
+# Routes that aren't measured (the scrape itself)
+UNMEASURED_ROUTES = {"metrics"}
+FLUSH_INTERVAL = 10
+FAILURE_BACKOFF = 60
+
+_client = None
+
+
+def get_client():
+    global _client
+    if _client is None:
+        # Short timeouts: metrics must never hold up a response for long
+        _client = redis.Redis.from_url(
+            settings.REDIS_URL, decode_responses=True, socket_connect_timeout=0.5, socket_timeout=0.5,
+        )
+    return _client
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class _RequestStats:
+    """Per-request totals; called by execute_wrapper for every query."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.render_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_time += time.perf_counter() - start
+
+
+def query_budget(method, url_name, route):
+    budgets = settings.QUERY_BUDGETS
+    for key in (f"{method} {url_name}", url_name, f"{method} {route}", route):
+        if key in budgets:
+            return budgets[key]
+    return settings.QUERY_BUDGET_DEFAULT
+
+
+def _response_size(response):
+    if response.has_header('Content-Length'):
+        return int(response['Content-Length'])
+    if getattr(response, 'streaming', False) or not getattr(response, 'is_rendered', True):
+        return 0
+    return len(response.content)
+
+
+class QueryMetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = request._query_stats = _RequestStats()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(stats))
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        match = request.resolver_match
+        route = match.route if match else UNMATCHED_ROUTE
+        if route in UNMEASURED_ROUTES:
+            return response
+        url_name = (match.url_name or '') if match else ''
+
+        budget = query_budget(request.method, url_name, route)
+        over_budget = budget is not None and stats.queries > budget
+        if settings.QUERY_METRICS_ENABLED:
+            _BUFFER.record(route, url_name, request.method, response.status_code, stats, duration,
+                           _response_size(response), over_budget)
+        if over_budget:
+            message = f"{request.method} {route} ran {stats.queries} queries (budget {budget})"
+            if settings.QUERY_BUDGET_ACTION == 'raise':
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+    def process_template_response(self, request, response):
+        # Called just before the response is rendered
+        stats = getattr(request, '_query_stats', None)
+        if stats is not None:
+            start = time.perf_counter()
+
+            def rendered(response):
+                stats.render_time += time.perf_counter() - start
+
+            response.add_post_render_callback(rendered)
+        return response
+
+
+def _series(route, url_name, method, status):
+    return f"{route}\t{url_name}\t{method}\t{status // 100}xx"
+
+
+class _Buffer:
+    """This process's metrics since the last push to Redis."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = defaultdict(int)
+        self._seconds = defaultdict(float)
+        self._next_push = time.monotonic() + FLUSH_INTERVAL
+
+    def record(self, route, url_name, method, status, stats, duration, size, over_budget):
+        series = _series(route, url_name, method, status)
+        bucket = next((le for le in DURATION_BUCKETS if duration <= le), "+Inf")
+        with self._lock:
+            self._counts[f"{series}\trequests"] += 1
+            self._counts[f"{series}\tqueries"] += stats.queries
+            self._counts[f"{series}\tbytes"] += size
+            self._counts[f"{series}\tbucket:{bucket}"] += 1
+            if over_budget:
+                self._counts[f"{series}\tover_budget"] += 1
+            self._seconds[f"{series}\tduration"] += duration
+            self._seconds[f"{series}\tdb"] += stats.db_time
+            self._seconds[f"{series}\trender"] += stats.render_time
+            due = time.monotonic() >= self._next_push
+            if due:
+                # Claimed by this request; others keep recording meanwhile
+                self._next_push = float("inf")
+        if due:
+            self.push()
+
+    def push(self):
+        """Add the buffered numbers to the shared hash; kept for a retry if Redis fails."""
+        with self._lock:
+            counts, self._counts = self._counts, defaultdict(int)
+            seconds, self._seconds = self._seconds, defaultdict(float)
+        try:
+            if counts or seconds:
+                pipe = get_client().pipeline(transaction=False)
+                for field, value in counts.items():
+                    pipe.hincrby(METRICS_KEY, field, value)
+                for field, value in seconds.items():
+                    pipe.hincrbyfloat(METRICS_KEY, field, value)
+                pipe.execute()
+            delay = FLUSH_INTERVAL
+        except redis.RedisError:
+            with self._lock:
+                for field, value in counts.items():
+                    self._counts[field] += value
+                for field, value in seconds.items():
+                    self._seconds[field] += value
+            delay = FAILURE_BACKOFF
+        with self._lock:
+            self._next_push = time.monotonic() + delay
+
+
+_BUFFER = _Buffer()
+
+
+# (metric name, recorded field, type, help)
+METRICS = [
+    ("http_requests_total", "requests", "counter", "Requests handled."),
+    ("http_request_db_queries_total", "queries", "counter", "SQL queries run by requests."),
+    ("http_request_db_seconds_total", "db", "counter", "Time spent in SQL queries."),
+    ("http_request_render_seconds_total", "render", "counter", "Time spent rendering (serializing) responses."),
+    ("http_response_bytes_total", "bytes", "counter", "Response body bytes."),
+    ("http_request_query_budget_exceeded_total", "over_budget", "counter", "Requests over their query budget."),
+]
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(route, url_name, method, status, **extra):
+    labels = {"route": route, "view": url_name, "method": method, "status": status, **extra}
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def export_metrics():
+    """All recorded metrics in the Prometheus text exposition format."""
+    _BUFFER.push()
+    series = defaultdict(dict)
+    for field, value in get_client().hgetall(METRICS_KEY).items():
+        route, url_name, method, status, name = field.split("\t")
+        series[(route, url_name, method, status)][name] = float(value)
+
+    lines = []
+    for metric, field, kind, help_text in METRICS:
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} {kind}"]
+        for key, values in sorted(series.items()):
+            lines.append(f"{metric}{_labels(*key)} {values.get(field, 0):.15g}")
+
+    metric = "http_request_duration_seconds"
+    lines += [f"# HELP {metric} Request duration.", f"# TYPE {metric} histogram"]
+    for key, values in sorted(series.items()):
+        cumulative = 0
+        for le in (*DURATION_BUCKETS, "+Inf"):
+            cumulative += values.get(f"bucket:{le}", 0)
+            lines.append(f"{metric}_bucket{_labels(*key, le=le)} {cumulative:.15g}")
+        lines.append(f"{metric}_sum{_labels(*key)} {values.get('duration', 0):.15g}")
+        lines.append(f"{metric}_count{_labels(*key)} {values.get('requests', 0):.15g}")
+    return "\n".join(lines) + "\n"
+
+
+def metrics_view(request):
+    """
+    Request metrics in the Prometheus text format. A plain Django view so the
+    scraper authenticates with X-Metrics-Token instead of a JWT.
+    """
+    token = settings.METRICS_TOKEN
+    if not token:
+        raise Http404
+    if not constant_time_compare(request.headers.get("X-Metrics-Token", ""), token):
+        return HttpResponse(status=403)
+    return HttpResponse(export_metrics(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,12 +1,77 @@
 # pagination.py
+import base64
+import binascii
+import json
+import math
+
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def keyset_filter(fields, values, lookup):
+    """
+    Q for rows whose (fields) tuple sorts after `values` in the `lookup` ("lt" or
+    "gt") direction: a < x OR (a = x AND b < y) ..., plus a bound on the leading
+    field alone so the (fields) index is range-scanned.
+    """
+    condition = Q()
+    for i, (field, value) in enumerate(zip(fields, values)):
+        condition |= Q(**dict(zip(fields[:i], values[:i])), **{f'{field}__{lookup}': value})
+    return Q(**{f'{fields[0]}__{lookup}e': values[0]}) & condition
+
+
+def estimated_count(queryset):
+    """
+    Row count estimate from the planner: pg_class.reltuples for an unfiltered
+    table, otherwise the row estimate of the query's plan.
+    """
+    queryset = queryset.order_by()
+    if not queryset.query.where:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT reltuples FROM pg_class WHERE oid = %s::regclass", [queryset.model._meta.db_table])
+            row = cursor.fetchone()
+        # -1 until the table is first vacuumed/analyzed
+        if row and row[0] >= 0:
+            return int(row[0])
+    plan = json.loads(queryset.explain(format='json'))
+    return int(plan[0]['Plan']['Plan Rows'])
+
 
 class CustomPageNumberPagination(PageNumberPagination):
+    """
+    Page-number pagination, with keyset pagination as a per-request opt-in for
+    views that set `keyset_ordering` (e.g. ('-date_joined', '-id'), a unique key
+    sorted in one direction): ?cursor= (empty for the first page) pages by
+    comparing (key) tuples instead of OFFSET, and `count` becomes a planner
+    estimate unless ?count=exact. The response envelope is the same, with
+    current_page null and next/previous links carrying the cursor.
+    """
     page_size = 30
     page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        ordering = getattr(view, 'keyset_ordering', None)
+        self.keyset = bool(ordering) and self.cursor_query_param in request.query_params
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+        return self._paginate_keyset(queryset, request, ordering)
 
     def get_paginated_response(self, data):
+        if self.keyset:
+            return Response({
+                'count': self.count,
+                'total_pages': math.ceil(self.count / self.keyset_page_size) if self.count else 0,
+                'current_page': None,
+                'next': self.next_link,
+                'previous': self.previous_link,
+                'results': data
+            })
         return Response({
             'count': self.page.paginator.count,
             'total_pages': self.page.paginator.num_pages,
@@ -15,3 +80,53 @@ class CustomPageNumberPagination(PageNumberPagination):
             'previous': self.get_previous_link(),
             'results': data
         })
+
+    def _decode_cursor(self, request, fields, model):
+        """(key values, reverse) from ?cursor=, or (None, False) for the first page."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            values = [model._meta.get_field(field).to_python(value) for field, value in zip(fields, cursor['k'], strict=True)]
+            return values, bool(cursor.get('r'))
+        except (binascii.Error, ValueError, TypeError, KeyError, ValidationError):
+            raise NotFound("Invalid cursor.")
+
+    def _encode_cursor(self, row, fields, reverse):
+        key = [row._meta.get_field(field).value_to_string(row) for field in fields]
+        cursor = base64.urlsafe_b64encode(json.dumps({'k': key, 'r': int(reverse)}).encode()).decode()
+        url = remove_query_param(self.request.build_absolute_uri(), self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def _paginate_keyset(self, queryset, request, ordering):
+        self.request = request
+        page_size = self.keyset_page_size = self.get_page_size(request)
+        fields = [name.lstrip('-') for name in ordering]
+        descending = ordering[0].startswith('-')
+        values, reverse = self._decode_cursor(request, fields, queryset.model)
+
+        if request.query_params.get('count') == 'exact':
+            self.count = queryset.count()
+        else:
+            self.count = estimated_count(queryset)
+
+        # Walking backwards (previous page) flips the comparison and the sort
+        if descending != reverse:
+            lookup, order = 'lt', [f'-{field}' for field in fields]
+        else:
+            lookup, order = 'gt', list(fields)
+        if values is not None:
+            queryset = queryset.filter(keyset_filter(fields, values, lookup))
+        rows = list(queryset.order_by(*order)[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+
+        # Backwards, the page we came from is next; forwards, the one we came from is previous
+        has_next = reverse or has_more
+        has_previous = has_more if reverse else values is not None
+        self.next_link = self._encode_cursor(rows[-1], fields, reverse=False) if rows and has_next else None
+        self.previous_link = self._encode_cursor(rows[0], fields, reverse=True) if rows and has_previous else None
+        return rows
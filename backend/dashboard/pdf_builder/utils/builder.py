@@ -4,15 +4,19 @@ from reportlab.lib.utils import ImageReader
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from PyPDF2 import PdfReader, PdfWriter
-from PIL import Image, ImageDraw, ImageEnhance, ImageFont
 import qrcode
 from io import BytesIO
 import barcode
-from barcode.writer import ImageWriter
+from functools import lru_cache
+from itertools import groupby
 import os
 
 from django.conf import settings
 
+from .derivatives import mask_image, open_derivative
+from .plans import get_render_plan
+from .template_cache import get_template
+
 
 # -------------------------------
 # Reusable helper functions
@@ -21,14 +25,52 @@ from django.conf import settings
 pdfmetrics.registerFont(TTFont("NotoSansDevanagari", os.path.join(settings.BASE_DIR, "dashboard", "pdf_builder", "templates", "Noto_Sans_Devanagari", "static", "NotoSansDevanagari_Condensed-ExtraBold.ttf")))
 # pdfmetrics.registerFont(TTFont("KRDEV_BOLD", os.path.join(settings.BASE_DIR, "dashboard", "pdf_builder", "templates", "Tiro_Devanagari_Hindi", "TiroDevanagariHindi-Regular.TTF")))
 
-def barcode_generator(data: str, width=200, height=50):
-    """Generate a barcode image reader."""
-    CODE128 = barcode.get_barcode_class('code128')
-    code128 = CODE128(data, writer=ImageWriter())
-    barcode_bytes = BytesIO()
-    code128.write(barcode_bytes, {'module_width': 0.2, 'module_height': height / 10.0, 'font_size': 10, 'write_text': False})
-    barcode_bytes.seek(0)
-    return ImageReader(barcode_bytes)
+# Code128 geometry as rendered by python-barcode's ImageWriter for Code128 (in mm), so vector
+# barcodes keep the proportions of the previous raster ones.
+BARCODE_MODULE_WIDTH = 0.2
+BARCODE_QUIET_ZONE = 2.54
+BARCODE_MARGIN = 1.0
+
+@lru_cache(maxsize=4096)
+def code128_bars(data: str):
+    """
+    Encode `data` as Code128.
+    Returns:
+        (module count, ((start module, width in modules), ...) of the dark bars)
+    """
+    line = barcode.get_barcode_class('code128')(data).build()[0]
+    bars = []
+    pos = 0
+    for module, group in groupby(line):
+        width = len(list(group))
+        if module == "1":
+            bars.append((pos, width))
+        pos += width
+    return len(line), tuple(bars)
+
+def draw_barcode(c, data: str, x, y, width, height):
+    """Draw a Code128 barcode as vector bars filling the box (x, y, width, height)."""
+    modules, bars = code128_bars(data)
+    bar_height = height / 10.0
+    scale_x = width / (2 * BARCODE_QUIET_ZONE + modules * BARCODE_MODULE_WIDTH)
+    scale_y = height / (2 * BARCODE_MARGIN + bar_height)
+
+    c.saveState()
+    c.setFillColorRGB(1, 1, 1)
+    c.rect(x, y, width, height, stroke=0, fill=1)
+    c.setFillColorRGB(0, 0, 0)
+    path = c.beginPath()
+    left = x + BARCODE_QUIET_ZONE * scale_x
+    bottom = y + BARCODE_MARGIN * scale_y
+    for start, bar_width in bars:
+        path.rect(
+            left + start * BARCODE_MODULE_WIDTH * scale_x,
+            bottom,
+            bar_width * BARCODE_MODULE_WIDTH * scale_x,
+            bar_height * scale_y,
+        )
+    c.drawPath(path, stroke=0, fill=1)
+    c.restoreState()
 
 def make_round_image(img_file, size=(100, 100), dpi=300, sharpen=True):
     """
@@ -41,33 +83,7 @@ def make_round_image(img_file, size=(100, 100), dpi=300, sharpen=True):
     Returns:
         ImageReader for ReportLab
     """
-    # Convert PDF points → pixels (72 points = 1 inch)
-    px_width = int(size[0] * dpi / 72)
-    px_height = int(size[1] * dpi / 72)
-
-    img = Image.open(img_file).convert("RGBA")
-    img = img.resize((px_width, px_height), Image.Resampling.LANCZOS)
-
-    # Optionally increase sharpness slightly
-    if sharpen:
-        enhancer = ImageEnhance.Sharpness(img)
-        img = enhancer.enhance(1.3)
-
-    # Create circular mask
-    mask = Image.new("L", (px_width, px_height), 0)
-    draw = ImageDraw.Draw(mask)
-    draw.ellipse((0, 0, px_width, px_height), fill=255)
-
-    # Apply mask
-    rounded = Image.new("RGBA", (px_width, px_height))
-    rounded.paste(img, (0, 0), mask=mask)
-
-    # Save as high-DPI PNG for ReportLab
-    rounded_bytes = BytesIO()
-    rounded.save(rounded_bytes, format="PNG", dpi=(dpi, dpi))
-    rounded_bytes.seek(0)
-
-    return ImageReader(rounded_bytes)
+    return ImageReader(BytesIO(mask_image(img_file, size, "round", dpi=dpi, sharpen=sharpen)))
 
 def make_soft_round_image(img_file, size=(100, 100), radius=20, dpi=300, sharpen=True):
     """
@@ -78,39 +94,45 @@ def make_soft_round_image(img_file, size=(100, 100), radius=20, dpi=300, sharpen
         radius: corner radius
         dpi: target print resolution
     """
+    return ImageReader(BytesIO(mask_image(img_file, size, "soft_round", radius=radius, dpi=dpi, sharpen=sharpen)))
 
-    px_width = int(size[0] * dpi / 72)
-    px_height = int(size[1] * dpi / 72)
-
-    img = Image.open(img_file).convert("RGBA")
-    img = img.resize((px_width, px_height), Image.Resampling.LANCZOS)
-
-    if sharpen:
-        enhancer = ImageEnhance.Sharpness(img)
-        img = enhancer.enhance(1.3)
-
-    mask = Image.new("L", (px_width, px_height), 0)
-    draw = ImageDraw.Draw(mask)
-    draw.rounded_rectangle((0, 0, px_width, px_height), radius=int(radius * dpi / 72), fill=255)
-
-    rounded = Image.new("RGBA", (px_width, px_height))
-    rounded.paste(img, (0, 0), mask=mask)
-
-    rounded_bytes = BytesIO()
-    rounded.save(rounded_bytes, format="PNG", dpi=(dpi, dpi))
-    rounded_bytes.seek(0)
-    return ImageReader(rounded_bytes)
-
-def generate_qr(data: str, box_size=2):
-    """Generate a QR code image reader."""
-    qr = qrcode.QRCode(box_size=box_size, border=1)
+@lru_cache(maxsize=4096)
+def qr_modules(data: str, border=1):
+    """
+    Encode `data` as a QR code.
+    Returns:
+        (modules per side including the border, ((row, column, length), ...) of dark runs)
+    """
+    qr = qrcode.QRCode(border=border)
     qr.add_data(data)
     qr.make(fit=True)
-    qr_img = qr.make_image(fill_color="black", back_color="white")
-    qr_bytes = BytesIO()
-    qr_img.save(qr_bytes)
-    qr_bytes.seek(0)
-    return ImageReader(qr_bytes)
+    matrix = qr.get_matrix()
+    runs = []
+    for row, cells in enumerate(matrix):
+        col = 0
+        for dark, group in groupby(cells):
+            length = len(list(group))
+            if dark:
+                runs.append((row, col, length))
+            col += length
+    return len(matrix), tuple(runs)
+
+def draw_qr(c, data: str, x, y, width, height):
+    """Draw a QR code as vector modules filling the box (x, y, width, height)."""
+    count, runs = qr_modules(data)
+    module_w = width / count
+    module_h = height / count
+
+    c.saveState()
+    c.setFillColorRGB(1, 1, 1)
+    c.rect(x, y, width, height, stroke=0, fill=1)
+    c.setFillColorRGB(0, 0, 0)
+    # One path for all modules, so viewers don't show seams between them
+    path = c.beginPath()
+    for row, col, length in runs:
+        path.rect(x + col * module_w, y + height - (row + 1) * module_h, length * module_w, module_h)
+    c.drawPath(path, stroke=0, fill=1)
+    c.restoreState()
 
 def generate_pdf(template_path, data_fields, document_type, layout, image_file=None, qr_text=None):
     """
@@ -120,6 +142,8 @@ def generate_pdf(template_path, data_fields, document_type, layout, image_file=N
         template_path (str/BytesIO): Path or buffer of the base PDF template.
         data_fields (dict): Dictionary of data to populate the fields.
         document_type (str): Key to select the correct layout ('idcard' or 'niyukti_certificate').
+        layout (dict/RenderPlan): Layout from templates.py, or an already compiled plan.
+            Layouts are compiled once and never modified.
         image_file (str/BytesIO, optional): Path or buffer of the photo to embed. Defaults to None.
         qr_text (str, optional): Data to encode in the QR code. Defaults to None.
         
@@ -127,148 +151,110 @@ def generate_pdf(template_path, data_fields, document_type, layout, image_file=N
         BytesIO: A buffer containing the final generated PDF.
     """
 
-    LAYOUT = layout
-    # 2. Update QR data within the selected layout configuration
-    # Note: This modifies the layout dictionary which might not be desirable
-    # for production use if the layouts object is shared. A deep copy would be better.
-    if LAYOUT.get("qr"):
-        LAYOUT["qr"]["data"] = qr_text
-
-    # --- Read template & get size ---
-    template_pdf = PdfReader(template_path)
-    first_page = template_pdf.pages[0]
-    width = float(first_page.mediabox.width)
-    height = float(first_page.mediabox.height)
-    # print(f"[DEBUG] Template size: {width}x{height}")
-
-    # --- Apply Scaling if defined in Layout ---
-    scaling_conf = LAYOUT.get("scaling")
-    if scaling_conf:
-        new_width = scaling_conf["width"]
-        new_height = scaling_conf["height"]
-        
-        # In the original code, all pages were scaled, but only the first page's size was checked.
-        for page in template_pdf.pages:
-            page.scale_to(new_width, new_height)
-        
-        width = new_width
-        height = new_height
-        # print(f"[DEBUG] New Template size: {width}x{height}")
+    plan = get_render_plan(layout)
+
+    # --- Fetch the parsed, pre-scaled template from the process-wide cache ---
+    template = get_template(template_path, plan.scaling)
+
+    overlay = render_overlay(plan, template.width, template.height, data_fields, image_file=image_file, qr_text=qr_text)
+
+    output_pdf = PdfWriter()
+    add_document_pages(output_pdf, template, overlay)
+
+    final_pdf = BytesIO()
+    output_pdf.write(final_pdf)
+    final_pdf.seek(0)
+    # print("[SUCCESS] PDF generation complete.")
+    return final_pdf
+
+
+def render_overlay(plan, width, height, data_fields, image_file=None, qr_text=None):
+    """
+    Draw the per-document content (text, photo, QR, barcode) onto a blank page.
 
+    Args:
+        plan (RenderPlan): Compiled layout.
+        width, height (float): Page size, i.e. the (scaled) template size.
+        data_fields, image_file, qr_text: As for generate_pdf.
+
+    Returns:
+        bytes: A one-page PDF to be stamped onto the template.
+    """
     packet = BytesIO()
     c = canvas.Canvas(packet, pagesize=(width, height))
 
     # --- 3. Draw text fields ---
-    for item in LAYOUT.get("text_fields", []):
-        field = item["name"]
-        if field in data_fields:
-            value = str(data_fields[field])
-            print(f"[FILL FIELD] {field}='{value}'")
-            font = item.get("font", "Helvetica")
-            size = item.get("size", 10)
-            align = item.get("align", "left")
-            max_width = item.get("max_width")
-            color = item.get("color", "black")
-
-            # Set color
-            if color == "white":
-                c.setFillColorRGB(1, 1, 1)
-            elif color == "black":
-                c.setFillColorRGB(0, 0, 0)
-            elif isinstance(color, tuple) and len(color) == 3:
-                c.setFillColorRGB(color[0]/255, color[1]/255, color[2]/255)
-            else:
-                c.setFillColorRGB(0, 0, 0) # Default to black
-                
-            current_size = size
-            c.setFont(font, current_size)
-            text_width = c.stringWidth(value, font, current_size)
-
-            # Auto shrink if max_width is given
-            if max_width and text_width > max_width:
-                current_size = current_size * max_width / text_width
-                c.setFont(font, current_size)
-                text_width = c.stringWidth(value, font, current_size)
-
-            x, y = item["x"], item["y"]
-
-            if align == "center":
-                c.drawCentredString(x, y, value)
-            elif align == "right":
-                c.drawRightString(x, y, value)
-            else:
-                c.drawString(x, y, value)
-            # print(f"[DRAW TEXT] {field}='{value}' at ({x},{y})")
+    for item in plan.text_fields:
+        if item.name not in data_fields:
+            continue
+        value = str(data_fields[item.name])
+        c.setFillColorRGB(*item.fill_rgb)
+        c.setFont(item.font, item.fit(value))
+
+        if item.align == "center":
+            c.drawCentredString(item.x, item.y, value)
+        elif item.align == "right":
+            c.drawRightString(item.x, item.y, value)
+        else:
+            c.drawString(item.x, item.y, value)
 
     # --- 4. Draw image if provided ---
-    if image_file and LAYOUT.get("image"):
-        img_conf = LAYOUT["image"]
-        size = (img_conf["width"], img_conf["height"])
-        
+    if image_file and plan.image:
+        img_conf = plan.image
+        size = (img_conf.width, img_conf.height)
+
+        # Use the derivative prepared at upload time, if there is one
+        derivative = open_derivative(image_file, img_conf)
+
         # Select the appropriate utility function
-        if img_conf.get("shape") == "round":
+        if derivative is not None:
+            img_reader = ImageReader(derivative)
+        elif img_conf.shape == "round":
             img_reader = make_round_image(image_file, size)
-        elif img_conf.get("shape") == "soft_round":
-            img_reader = make_soft_round_image(image_file, size, radius=img_conf.get("radius", 20))
+        elif img_conf.shape == "soft_round":
+            img_reader = make_soft_round_image(image_file, size, radius=img_conf.radius)
         else:
             img_reader = ImageReader(image_file)
-            
+
         c.drawImage(
             img_reader,
-            img_conf["x"],
-            img_conf["y"],
-            width=img_conf["width"],
-            height=img_conf["height"],
+            img_conf.x,
+            img_conf.y,
+            width=img_conf.width,
+            height=img_conf.height,
             mask="auto",
         )
-        # print(f"[DRAW IMAGE] at ({img_conf['x']},{img_conf['y']}) size={size}")
 
     # --- 5. Draw QR code if provided ---
-    if LAYOUT.get("qr") and LAYOUT["qr"].get("data"):
-        qr_conf = LAYOUT["qr"]
-        qr_text_data = LAYOUT["qr"]["data"]
-        
-        qr_reader = generate_qr(qr_text_data)
-        c.drawImage(
-            qr_reader,
-            qr_conf["x"],
-            qr_conf["y"],
-            width=qr_conf["width"],
-            height=qr_conf["height"],
-        )
-        # print(f"[DRAW QR] '{qr_text_data}' at ({qr_conf['x']},{qr_conf['y']})")
+    if plan.qr and qr_text:
+        qr_conf = plan.qr
+        draw_qr(c, qr_text, qr_conf.x, qr_conf.y, qr_conf.width, qr_conf.height)
 
-
-    if LAYOUT.get("barcode"):
+    if plan.barcode:
         barcode_text = data_fields.get("reg_no", "000000")
-        barcode_conf = LAYOUT["barcode"]
-        barcode_reader = barcode_generator(barcode_text, width=barcode_conf["width"], height=barcode_conf["height"])
-        c.drawImage(
-            barcode_reader,
-            barcode_conf["x"],
-            barcode_conf["y"],
-            width=barcode_conf["width"],
-            height=barcode_conf["height"],
-        )
-        
+        barcode_conf = plan.barcode
+        draw_barcode(c, barcode_text, barcode_conf.x, barcode_conf.y, barcode_conf.width, barcode_conf.height)
+
     c.save()
-    packet.seek(0)
-    # --- 6. Merge overlay ---
-    overlay_pdf = PdfReader(packet)
-    output_pdf = PdfWriter()
+    return packet.getvalue()
+
+
+def add_document_pages(output_pdf, template, overlay):
+    """
+    Append one document to a PdfWriter: the template's first page with the
+    overlay on top, followed by the template's remaining pages.
+
+    Template objects are shared, so a writer holding many documents built from the
+    same cached template stores the template artwork only once.
+    """
+    overlay_pdf = PdfReader(BytesIO(overlay))
 
-    # Merge the overlay (canvas content) onto the first page of the template
-    first_page.merge_page(overlay_pdf.pages[0])
-    output_pdf.add_page(first_page)
+    # Cached template pages are shared between requests, so stamp the overlay
+    # onto a new page instead of merging into the template page itself.
+    output_pdf.add_page(template.stamp(overlay_pdf.pages[0]))
 
     # Duplicate remaining pages
-    for i in range(1, len(template_pdf.pages)):
-        output_pdf.add_page(template_pdf.pages[i])
-         
-    final_pdf = BytesIO()
-    output_pdf.write(final_pdf)
-    final_pdf.seek(0)
-    # print("[SUCCESS] PDF generation complete.")
-    return final_pdf
+    for page in template.pages[1:]:
+        output_pdf.add_page(page)
 
 
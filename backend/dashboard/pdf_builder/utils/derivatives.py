@@ -0,0 +1,135 @@
+import os
+import posixpath
+from io import BytesIO
+
+from PIL import Image, ImageDraw, ImageEnhance
+from django.core.files.base import ContentFile
+
+
+# -------------------------------
+# Photo derivatives
+# -------------------------------
+#
+# Masking a photo (decode, 300-DPI resize, sharpen, mask, PNG-encode) is the most
+# expensive part of rendering a document. Derivatives are the finished PNGs for
+# each image plan, generated once per upload and stored next to the original as
+#   <upload dir>/derivatives/<stem>_<shape>_<w>x<h>_r<radius>.png
+# Uploaded files are never overwritten in place, so a derivative can't go stale.
+
+DERIVATIVE_DIR = "derivatives"
+MASKED_SHAPES = ("round", "soft_round")
+
+
+def _masked_png(img, size, shape, radius=20, dpi=300, sharpen=True):
+    """Resize, sharpen and mask an RGBA image. Returns PNG bytes."""
+    # Convert PDF points → pixels (72 points = 1 inch)
+    px_width = int(size[0] * dpi / 72)
+    px_height = int(size[1] * dpi / 72)
+
+    img = img.resize((px_width, px_height), Image.Resampling.LANCZOS)
+
+    # Optionally increase sharpness slightly
+    if sharpen:
+        enhancer = ImageEnhance.Sharpness(img)
+        img = enhancer.enhance(1.3)
+
+    mask = Image.new("L", (px_width, px_height), 0)
+    draw = ImageDraw.Draw(mask)
+    if shape == "round":
+        draw.ellipse((0, 0, px_width, px_height), fill=255)
+    else:
+        draw.rounded_rectangle((0, 0, px_width, px_height), radius=int(radius * dpi / 72), fill=255)
+
+    # Apply mask
+    masked = Image.new("RGBA", (px_width, px_height))
+    masked.paste(img, (0, 0), mask=mask)
+
+    # Save as high-DPI PNG for ReportLab
+    png = BytesIO()
+    masked.save(png, format="PNG", dpi=(dpi, dpi))
+    return png.getvalue()
+
+
+def mask_image(img_file, size, shape, radius=20, dpi=300, sharpen=True):
+    """
+    Render a masked photo.
+    Args:
+        img_file: file-like object or path
+        size: (width, height) in PDF points
+        shape: "round" or "soft_round"
+        radius: corner radius in points (soft_round only)
+        dpi: output resolution (default 300 for print quality)
+        sharpen: optionally enhance image sharpness
+    Returns:
+        bytes: PNG data
+    """
+    img = Image.open(img_file).convert("RGBA")
+    return _masked_png(img, size, shape, radius=radius, dpi=dpi, sharpen=sharpen)
+
+
+def derivative_name(name, image):
+    """Storage name (or filesystem path) of the derivative of `name` for an ImagePlan."""
+    directory, filename = posixpath.split(name)
+    stem = os.path.splitext(filename)[0]
+    variant = f"{image.shape}_{image.width:g}x{image.height:g}_r{image.radius:g}"
+    return posixpath.join(directory, DERIVATIVE_DIR, f"{stem}_{variant}.png")
+
+
+def generate_derivatives(photo, images):
+    """
+    Store the missing derivatives of an uploaded photo.
+
+    Args:
+        photo (FieldFile): The saved original.
+        images (iterable of ImagePlan): Plans to generate variants for.
+
+    Returns:
+        list: Storage names of the derivatives created.
+    """
+    storage = photo.storage
+    missing = [
+        (image, derivative_name(photo.name, image))
+        for image in images
+        if image.shape in MASKED_SHAPES
+    ]
+    missing = [(image, name) for image, name in missing if not storage.exists(name)]
+    if not missing:
+        return []
+
+    # Decode the original once for all variants
+    with storage.open(photo.name, "rb") as f:
+        source = Image.open(f).convert("RGBA")
+
+    created = []
+    for image, name in missing:
+        png = _masked_png(source, (image.width, image.height), image.shape, radius=image.radius)
+        saved = storage.save(name, ContentFile(png))
+        if saved != name:
+            # Generated concurrently; keep the first copy.
+            storage.delete(saved)
+        created.append(name)
+    return created
+
+
+def open_derivative(image_file, image):
+    """
+    Return the stored derivative of a photo for an ImagePlan, or None if there is
+    none. `image_file` may be a FieldFile or a filesystem path; buffers have no
+    derivatives.
+    """
+    if image.shape not in MASKED_SHAPES:
+        return None
+    if isinstance(image_file, str):
+        path = derivative_name(image_file, image)
+        return path if os.path.exists(path) else None
+
+    storage = getattr(image_file, "storage", None)
+    name = getattr(image_file, "name", None)
+    if storage is None or not name:
+        return None
+    name = derivative_name(name, image)
+    try:
+        with storage.open(name, "rb") as f:
+            return BytesIO(f.read())
+    except FileNotFoundError:
+        return None
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+import threading
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from reportlab.pdfbase import pdfmetrics
+
+
+# -------------------------------
+# Compiled, immutable render plans
+# -------------------------------
+#
+# The layout dicts in templates.py are plain configuration. Before drawing, each
+# one is compiled once into a frozen RenderPlan with defaults applied, fonts looked
+# up and colours converted, so request threads only ever read shared layout state.
+# Per-request values (field data, photo, QR text) are passed to generate_pdf
+# separately and never stored on the plan.
+
+NAMED_COLORS = {
+    "white": (1.0, 1.0, 1.0),
+    "black": (0.0, 0.0, 0.0),
+}
+
+
+@dataclass(frozen=True)
+class TextFieldPlan:
+    name: str
+    x: float
+    y: float
+    font: str
+    face: object
+    size: float
+    align: str
+    max_width: Optional[float]
+    fill_rgb: Tuple[float, float, float]
+
+    def fit(self, value):
+        """Return the font size for value, shrunk to max_width when needed."""
+        if self.max_width:
+            text_width = self.face.stringWidth(value, self.size)
+            if text_width > self.max_width:
+                return self.size * self.max_width / text_width
+        return self.size
+
+
+@dataclass(frozen=True)
+class BoxPlan:
+    x: float
+    y: float
+    width: float
+    height: float
+
+
+@dataclass(frozen=True)
+class ImagePlan(BoxPlan):
+    shape: Optional[str] = None
+    radius: float = 20
+
+
+@dataclass(frozen=True)
+class RenderPlan:
+    scaling: Optional[Tuple[float, float]]
+    text_fields: Tuple[TextFieldPlan, ...]
+    image: Optional[ImagePlan]
+    qr: Optional[BoxPlan]
+    barcode: Optional[BoxPlan]
+
+
+def _resolve_color(color):
+    if isinstance(color, tuple) and len(color) == 3:
+        return (color[0] / 255, color[1] / 255, color[2] / 255)
+    return NAMED_COLORS.get(color, NAMED_COLORS["black"])
+
+
+def _box(conf):
+    return BoxPlan(conf["x"], conf["y"], conf["width"], conf["height"])
+
+
+def compile_layout(layout):
+    """
+    Compile a layout dict (see templates.py) into a frozen RenderPlan.
+
+    Fonts must already be registered with ReportLab.
+    """
+    text_fields = []
+    for item in layout.get("text_fields", []):
+        font = item.get("font", "Helvetica")
+        text_fields.append(TextFieldPlan(
+            name=item["name"],
+            x=item["x"],
+            y=item["y"],
+            font=font,
+            face=pdfmetrics.getFont(font),
+            size=item.get("size", 10),
+            align=item.get("align", "left"),
+            max_width=item.get("max_width"),
+            fill_rgb=_resolve_color(item.get("color", "black")),
+        ))
+
+    image = None
+    if layout.get("image"):
+        img_conf = layout["image"]
+        image = ImagePlan(
+            img_conf["x"], img_conf["y"], img_conf["width"], img_conf["height"],
+            shape=img_conf.get("shape"),
+            radius=img_conf.get("radius", 20),
+        )
+
+    scaling = layout.get("scaling")
+    return RenderPlan(
+        scaling=(scaling["width"], scaling["height"]) if scaling else None,
+        text_fields=tuple(text_fields),
+        image=image,
+        qr=_box(layout["qr"]) if layout.get("qr") else None,
+        barcode=_box(layout["barcode"]) if layout.get("barcode") else None,
+    )
+
+
+_plans = {}
+_lock = threading.Lock()
+
+
+def get_render_plan(layout):
+    """
+    Return the compiled plan for a layout, compiling it on first use.
+
+    Plans are cached per layout object, so this is meant for the module-level
+    layouts in templates.py, which are treated as read-only once rendered. Pass a
+    RenderPlan directly for one-off layouts.
+    """
+    if isinstance(layout, RenderPlan):
+        return layout
+
+    entry = _plans.get(id(layout))
+    if entry is None:
+        with _lock:
+            entry = _plans.get(id(layout))
+            if entry is None:
+                # Keep a reference to the layout so its id() can't be reused.
+                entry = _plans[id(layout)] = (layout, compile_layout(layout))
+    return entry[1]
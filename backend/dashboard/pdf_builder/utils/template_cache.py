@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+import os
+import threading
+from io import BytesIO
+
+from PyPDF2 import PageObject, PdfReader, PdfWriter
+from PyPDF2.generic import (
+    ArrayObject,
+    DecodedStreamObject,
+    DictionaryObject,
+    FloatObject,
+    IndirectObject,
+    NameObject,
+)
+
+
+# -------------------------------
+# Process-wide template cache
+# -------------------------------
+#
+# Every worker parses each PDF template once, applies the layout scaling once and
+# keeps the parsed pages in memory. Pages handed out from here are shared between
+# requests (and threads), so they must never be mutated: use stamp() to combine a
+# page with an overlay, and only pass shared pages to PdfWriter.add_page (which
+# clones them into the writer).
+
+_templates = {}
+_lock = threading.Lock()
+
+
+class CachedTemplate:
+    """A parsed, pre-scaled PDF template whose objects are fully resolved."""
+
+    def __init__(self, reader):
+        self.reader = reader
+        self.pages = tuple(reader.pages)
+        first_page = self.pages[0]
+        self.width = float(first_page.mediabox.width)
+        self.height = float(first_page.mediabox.height)
+
+    def stamp(self, overlay_page, index=0):
+        """
+        Return a new page showing the template page with the overlay drawn on top.
+
+        The overlay is wrapped in a form XObject and the template's content
+        streams are referenced as-is, so nothing shared is mutated and the
+        template content is never re-parsed per request.
+        """
+        template_page = self.pages[index]
+        page = PageObject(self.reader, template_page.indirect_reference)
+        dict.update(page, dict.items(template_page))
+
+        overlay = _stream(overlay_page.get_contents().get_data(), compress=True)
+        overlay.update({
+            NameObject("/Type"): NameObject("/XObject"),
+            NameObject("/Subtype"): NameObject("/Form"),
+            NameObject("/BBox"): ArrayObject([FloatObject(v) for v in overlay_page.mediabox]),
+            NameObject("/Resources"): overlay_page.get("/Resources", DictionaryObject()),
+        })
+
+        resources = DictionaryObject(dict.items(page.get("/Resources", DictionaryObject())))
+        xobjects = DictionaryObject(dict.items(resources.get("/XObject", DictionaryObject())))
+        name = "/Overlay"
+        while name in xobjects:
+            name += "_"
+        xobjects[NameObject(name)] = overlay
+        resources[NameObject("/XObject")] = xobjects
+        page[NameObject("/Resources")] = resources
+
+        contents = dict.get(page, "/Contents")
+        if isinstance(contents, IndirectObject) and isinstance(contents.get_object(), ArrayObject):
+            contents = contents.get_object()
+        if isinstance(contents, ArrayObject):
+            contents = list(list.__iter__(contents))
+        else:
+            contents = [contents] if contents is not None else []
+
+        head = _stream(b"q\n")
+        tail = _stream(("\nQ\nq %s Do Q\n" % name).encode())
+        page[NameObject("/Contents")] = ArrayObject([head, *contents, tail])
+        return page
+
+
+def _stream(data, compress=False):
+    stream = DecodedStreamObject()
+    stream.set_data(data)
+    if compress:
+        stream = stream.flate_encode()
+    # PdfWriter only turns new streams into indirect objects if this is set.
+    stream.indirect_reference = None
+    return stream
+
+
+def _resolve_all(root):
+    """
+    Walk the object graph so every indirect object is loaded into the reader's
+    cache. Afterwards the reader never touches its underlying stream again, which
+    is what makes sharing it between threads safe.
+    """
+    seen = set()
+    stack = [root]
+    while stack:
+        obj = stack.pop()
+        if isinstance(obj, IndirectObject):
+            key = (obj.idnum, obj.generation)
+            if key in seen:
+                continue
+            seen.add(key)
+            obj = obj.get_object()
+
+        if isinstance(obj, DictionaryObject):
+            stack.extend(dict.values(obj))
+        elif isinstance(obj, ArrayObject):
+            stack.extend(list.__iter__(obj))
+
+
+def _load_template(template_path, scaling):
+    if isinstance(template_path, (str, os.PathLike)):
+        with open(template_path, "rb") as f:
+            reader = PdfReader(BytesIO(f.read()))
+    else:
+        reader = PdfReader(template_path)
+
+    if scaling:
+        # Bake the scaling into a new document so the cached pages are final.
+        writer = PdfWriter()
+        for page in reader.pages:
+            page.scale_to(*scaling)
+            writer.add_page(page)
+        scaled = BytesIO()
+        writer.write(scaled)
+        scaled.seek(0)
+        reader = PdfReader(scaled)
+
+    _resolve_all(reader.trailer)
+    return CachedTemplate(reader)
+
+
+def get_template(template_path, scaling=None):
+    """
+    Return the cached template for the given path and scaling, parsing it on
+    first use.
+
+    Args:
+        template_path (str/BytesIO): Path or buffer of the base PDF template.
+            Buffers are parsed every time and never cached.
+        scaling (tuple, optional): (width, height) to scale every page to.
+
+    Returns:
+        CachedTemplate
+    """
+    if not isinstance(template_path, (str, os.PathLike)):
+        return _load_template(template_path, scaling)
+
+    key = (os.path.abspath(template_path), scaling)
+    template = _templates.get(key)
+    if template is None:
+        with _lock:
+            template = _templates.get(key)
+            if template is None:
+                template = _load_template(template_path, scaling)
+                _templates[key] = template
+    return template
+
+
+def clear_template_cache():
+    """Drop every cached template (e.g. after replacing a template file)."""
+    with _lock:
+        _templates.clear()
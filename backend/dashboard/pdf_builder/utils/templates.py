@@ -1,5 +1,8 @@
 # idcards/utils/templates_config.py
 
+# Bump whenever a layout below changes, so previously stored documents are not reused.
+LAYOUT_VERSION = 1
+
 # ID Card layout
 ID_CARD_LAYOUT = {
         "scaling": {"width": 153.0, "height": 243.0},
@@ -0,0 +1,131 @@
+from django.db import transaction
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+
+from account.models import User
+from volunteer.models import Application, Volunteer
+from vyapari.models import Vyapari
+from .fuzzy import FUZZY_INDEXES
+from .models import District, State
+from .counters import USER_COUNT_FLAGS, adjust_user_counts
+from .document_store import invalidate_user_documents
+from .tasks import prepare_photo_derivatives
+
+# User fields that end up on a generated document
+DOCUMENT_USER_FIELDS = {'name', 'user_id', 'phone', 'date_joined', 'blood_group', 'district', 'state', 'image', 'is_volunteer'}
+
+
+def _invalidate_documents(user_pk):
+    transaction.on_commit(lambda: invalidate_user_documents(user_pk))
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        return
+    if update_fields is not None and not DOCUMENT_USER_FIELDS.intersection(update_fields):
+        return
+    _invalidate_documents(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    _invalidate_documents(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Volunteer)
+def volunteer_changed(sender, instance, **kwargs):
+    _invalidate_documents(instance.user_id)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Volunteer)
+@receiver(post_save, sender=Application)
+def photo_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and 'image' not in update_fields:
+        return
+    if not instance.image:
+        return
+    # Existing derivatives are skipped, so re-saving an unchanged photo is cheap.
+    transaction.on_commit(lambda: prepare_photo_derivatives.delay(sender._meta.label, instance.pk))
+
+
+def _count_flags(instance):
+    # Read from __dict__ so deferred fields aren't loaded
+    return {name: instance.__dict__.get(flag) for name, flag in USER_COUNT_FLAGS.items()}
+
+
+@receiver(post_init, sender=User)
+def remember_count_flags(sender, instance, **kwargs):
+    instance._count_flags = _count_flags(instance)
+    instance._indexed_name = instance.__dict__.get('name')
+
+
+@receiver(post_save, sender=User)
+def update_user_counts(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and not set(USER_COUNT_FLAGS.values()).intersection(update_fields):
+        return
+    old, new = instance._count_flags, _count_flags(instance)
+    instance._count_flags = new
+    if created:
+        deltas = {"total_user": 1, **{name: 1 for name, value in new.items() if value}}
+    else:
+        # Flags not loaded before (deferred) can't be diffed; beat recounts those
+        deltas = {
+            name: int(bool(new[name])) - int(bool(old[name]))
+            for name in new
+            if old[name] is not None and new[name] is not None
+        }
+    transaction.on_commit(lambda: adjust_user_counts(deltas))
+
+
+@receiver(post_delete, sender=User)
+def user_count_deleted(sender, instance, **kwargs):
+    flags = instance._count_flags
+    deltas = {"total_user": -1, **{name: -1 for name, value in flags.items() if value}}
+    transaction.on_commit(lambda: adjust_user_counts(deltas))
+
+
+def _mark_fuzzy_changed(name):
+    transaction.on_commit(FUZZY_INDEXES[name].mark_changed)
+
+
+@receiver(post_save, sender=User)
+def user_name_saved(sender, instance, created, **kwargs):
+    if created or instance.name != instance._indexed_name:
+        instance._indexed_name = instance.name
+        _mark_fuzzy_changed("user")
+
+
+@receiver(post_delete, sender=User)
+def user_name_deleted(sender, instance, **kwargs):
+    _mark_fuzzy_changed("user")
+
+
+@receiver(post_init, sender=Vyapari)
+def remember_vyapari_name(sender, instance, **kwargs):
+    instance._indexed_name = instance.__dict__.get('name')
+
+
+@receiver(post_save, sender=Vyapari)
+def vyapari_name_saved(sender, instance, created, **kwargs):
+    if created or instance.name != instance._indexed_name:
+        instance._indexed_name = instance.name
+        _mark_fuzzy_changed("vyapari")
+
+
+@receiver(post_delete, sender=Vyapari)
+def vyapari_name_deleted(sender, instance, **kwargs):
+    _mark_fuzzy_changed("vyapari")
+
+
+@receiver([post_save, post_delete], sender=District)
+def district_changed(sender, instance, **kwargs):
+    _mark_fuzzy_changed("district")
+
+
+@receiver([post_save, post_delete], sender=State)
+def state_changed(sender, instance, **kwargs):
+    # District entries carry their state's name
+    _mark_fuzzy_changed("state")
+    _mark_fuzzy_changed("district")
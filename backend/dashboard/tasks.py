@@ -0,0 +1,53 @@
+from celery import shared_task
+from django.apps import apps
+
+from account.models import User
+from .batch import generate_batch, user_document_queryset
+from .counters import refresh_user_counts
+from .document_store import get_user_document
+from .documents import generate_photo_derivatives
+
+
+@shared_task(bind=True)
+def generate_document_batch(self, document_type, filters=None, output_format="zip"):
+    """
+    Batch-generate documents for the users matching `filters` (state, district,
+    wing, user_ids). Progress is reported through the task state.
+
+    Renders in the worker process itself: Celery's pool processes are daemonic and
+    can't start a process pool of their own. Use the generate_documents management
+    command for multi-process runs.
+    """
+    users = user_document_queryset(document_type, **(filters or {}))
+
+    def progress(done, total):
+        if done % 50 == 0 or done == total:
+            self.update_state(state="PROGRESS", meta={"done": done, "total": total})
+
+    return generate_batch(users, document_type, output_format=output_format, progress=progress)
+
+
+@shared_task
+def generate_user_document_task(user_pk, document_type):
+    """
+    Render (or find) a user's document in the store. The result names the stored
+    file for the job download endpoint.
+    """
+    user = User.objects.select_related("volunteer__designation").get(pk=user_pk)
+    name = get_user_document(user, document_type)
+    return {"user": user_pk, "document_type": document_type, "name": name}
+
+
+@shared_task
+def prepare_photo_derivatives(model_label, pk, field_name="image"):
+    """Generate the document derivatives of a saved photo, e.g. ("account.User", 1)."""
+    instance = apps.get_model(model_label).objects.filter(pk=pk).first()
+    if instance is None:
+        return []
+    return generate_photo_derivatives(getattr(instance, field_name))
+
+
+@shared_task
+def refresh_user_counts_task():
+    """Recount the dashboard user counters (run periodically by celery beat)."""
+    return refresh_user_counts()
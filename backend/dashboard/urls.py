@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import DashboardView, DistrictListView, StateListView, UserCountView, ReferralListView, UserReferralListView, GetDocumentView
+from .views import DashboardView, DistrictListView, StateListView, UserCountView, ReferralListView, UserReferralListView, GetDocumentView, DocumentJobView, DocumentJobDownloadView, DocumentBatchView, DocumentBatchStatusView, DocumentBatchDownloadView, FuzzySearchView
 
 urlpatterns = [
     path('', DashboardView.as_view(), name='dashboard'),
@@ -7,6 +7,12 @@ urlpatterns = [
     path('referrals/', ReferralListView.as_view(), name='referral-list'),
     path('referrals/<str:user_id>/', UserReferralListView.as_view(), name='user-referral-list'),
     path('documents/generate/', GetDocumentView.as_view(), name='generate-document'),
+    path('documents/jobs/<str:job_id>/', DocumentJobView.as_view(), name='document-job-status'),
+    path('documents/jobs/<str:job_id>/download/', DocumentJobDownloadView.as_view(), name='document-job-download'),
+    path('documents/batch/', DocumentBatchView.as_view(), name='document-batch'),
+    path('documents/batch/<str:job_id>/', DocumentBatchStatusView.as_view(), name='document-batch-status'),
+    path('documents/batch/<str:job_id>/files/<int:index>/', DocumentBatchDownloadView.as_view(), name='document-batch-download'),
+    path('fuzzy-search/', FuzzySearchView.as_view(), name='fuzzy-search'),
     path('districts/', DistrictListView.as_view(), name='district-list'),
     path('states/', StateListView.as_view(), name='state-list'),
 ]
\ No newline at end of file
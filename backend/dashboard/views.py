@@ -1,12 +1,14 @@
 import os
-from django.conf import settings
+import uuid
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.generics import ListAPIView
 from django.db.models import Count
-from django.http import FileResponse
+from django.conf import settings
+from django.urls import reverse
+from celery.result import AsyncResult
 from django_filters.rest_framework import DjangoFilterBackend
 
 from account.models import User
@@ -16,8 +18,11 @@ from vyapari.serializers import VyapariSerializer
 from vyapari.models import Vyapari
 from .models import District, State
 from .serializers import DistrictSerializer, StateSerializer
-from .pdf_builder.utils.builder import generate_pdf
-from .pdf_builder.utils.templates import ID_CARD_LAYOUT, CERTIFICATE_LAYOUT, JOINING_LETTER_LAYOUT
+from .counters import get_user_counts
+from .fuzzy import FUZZY_INDEXES
+from .documents import DOCUMENT_TEMPLATES, DocumentError, get_document_data
+from .document_store import document_exists, get_user_document, serve_document
+from .tasks import generate_document_batch, generate_user_document_task
 
 
 
@@ -40,26 +45,7 @@ class UserCountView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        total_user = User.objects.all().count()
-        verified_user = User.objects.filter(is_verified=True).count()
-        blocked_user = User.objects.filter(is_blocked=True).count()
-        member_user = User.objects.filter(is_member_account=True).count()
-        volunteer_user = User.objects.filter(is_volunteer=True).count()
-        business_user = User.objects.filter(is_business_account=True).count()
-        staff_user = User.objects.filter(is_staff_account=True).count()
-        admin_user = User.objects.filter(is_admin_account=True).count()
-
-        data = {
-            "total_user": total_user,
-            "verified_user": verified_user,
-            "member_user": member_user,
-            "volunteer_user": volunteer_user,
-            "business_user": business_user,
-            "staff_user": staff_user,
-            "admin_user": admin_user,
-            "blocked_user": blocked_user,
-        }
-        return Response(data, status=status.HTTP_200_OK)
+        return Response(get_user_counts(), status=status.HTTP_200_OK)
     
 class ReferralListView(ListAPIView):
     permission_classes = [IsAuthenticated]
@@ -84,62 +70,131 @@ class GetDocumentView(APIView):
     def post(self, request):
         doc_type = request.data.get("document_type")
         user = request.user
-        photo = user.image if user.image else None
         if not doc_type:
             return Response({"error": "Missing document type"}, status=400)
-        
-        qr_text = f"{settings.FRONTEND_URL}/idcard-verify/{user.user_id}"
-        if doc_type == "idcard":
-            template_path = os.path.join(settings.BASE_DIR, "dashboard", "pdf_builder", "templates", "documents", "id_card.pdf")
-            layout = ID_CARD_LAYOUT
-            data = {
-            "name": user.name,
-            "reg_no": f'{user.user_id}',
-            "in": user.volunteer.designation if user.is_volunteer else "Member",
-            "mob": user.phone,
-            "date": user.volunteer.joined_date.strftime("%d-%m-%Y") if user.is_volunteer else user.date_joined.strftime("%d-%m-%Y"),
-            "block": f'{user.blood_group}',
-            "district": user.district,
-            "state": user.state,
-            }
-            pdf_buffer = generate_pdf(template_path, data, document_type=doc_type, layout=layout, image_file=photo, qr_text=qr_text)
-        elif doc_type == "certificate":
-            if not user.is_volunteer:
-                return Response({"error": "User is not a volunteer"}, status=400)
-            template_path = os.path.join(settings.BASE_DIR, "dashboard", "pdf_builder", "templates", "documents", "niyukti.pdf")
-            layout = CERTIFICATE_LAYOUT
-            data = {
-                "image": user.volunteer.image,
-                "name": user.volunteer.hindi_name if user.volunteer.hindi_name else user.name,
-                "reg_no": f'{user.user_id}',
-                "reg_date": user.volunteer.joined_date.strftime("%d-%m-%Y"),
-                "valid_till": user.volunteer.joined_date.replace(year=user.volunteer.joined_date.year + 1).strftime("%d-%m-%Y"),
-            }
-            print(f"[DEBUG] Generating certificate for {data['name']} with reg_no {data['reg_no']}, image: {data['image']}")
-            pdf_buffer = generate_pdf(template_path, data, document_type=doc_type, layout=layout, image_file=photo, qr_text=qr_text)
-            
-        # elif doc_type == "membership_certificate":
-        #     if not user.is_member_account:
-        #         return Response({"error": "User is not a member"}, status=400)
-        #     template_path = os.path.join(settings.BASE_DIR, "dashboard", "pdf_builder", "templates", "documents", "member_welcome_letter.pdf")
-        #     layout = JOINING_LETTER_LAYOUT
-        #     data = {
-        #         "name": user.name,
-        #         "address": f'{user.city}, {user.district}, {user.state}',
-        #         "joining_date": user.date_joined.strftime("%d-%m-%Y"),
-        #         "reg_no": f'R{user.user_id}',
-        #     }
-        #     pdf_buffer = generate_pdf(template_path, data, document_type=doc_type, layout=layout, image_file=photo, qr_text=qr_text)
-        else:
+
+        run_async = request.data.get("async", settings.DOCUMENTS_ASYNC)
+        if str(run_async).lower() in ("1", "true", "yes"):
+            try:
+                # Validate up front so bad requests fail here, not in the worker
+                get_document_data(user, doc_type)
+            except DocumentError as e:
+                return Response({"error": str(e)}, status=400)
+            # The job id carries the owner, so status checks need no lookup
+            job_id = f"{user.pk}-{uuid.uuid4()}"
+            generate_user_document_task.apply_async((user.pk, doc_type), task_id=job_id)
+            return Response({
+                "job_id": job_id,
+                "status_url": request.build_absolute_uri(reverse("document-job-status", args=[job_id])),
+            }, status=status.HTTP_202_ACCEPTED)
+
+        try:
+            name = get_user_document(user, doc_type)
+        except DocumentError as e:
+            return Response({"error": str(e)}, status=400)
+
+        return serve_document(name, f"{doc_type}.pdf")
+
+class DocumentJobView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get_result(self, request, job_id):
+        if job_id.split("-", 1)[0] != str(request.user.pk):
+            return None
+        return AsyncResult(job_id)
+
+    def get(self, request, job_id):
+        result = self.get_result(request, job_id)
+        if result is None:
+            return Response({"error": "Job not found"}, status=404)
+        data = {"job_id": job_id, "status": result.state}
+        if result.successful():
+            data["download_url"] = request.build_absolute_uri(reverse("document-job-download", args=[job_id]))
+        elif result.failed():
+            data["error"] = str(result.result)
+        return Response(data, status=status.HTTP_200_OK)
+
+class DocumentJobDownloadView(DocumentJobView):
+    def get(self, request, job_id):
+        result = self.get_result(request, job_id)
+        if result is None:
+            return Response({"error": "Job not found"}, status=404)
+        if not result.successful():
+            return Response({"error": "Document is not ready", "status": result.state}, status=409)
+        name = result.result["name"]
+        if not document_exists(name):
+            # Invalidated by a profile change since the job ran
+            return Response({"error": "Document has expired, please generate it again"}, status=410)
+        return serve_document(name, f"{result.result['document_type']}.pdf")
+
+class DocumentBatchView(APIView):
+    permission_classes = [IsAdminOrIsStaff]
+
+    def post(self, request):
+        doc_type = request.data.get("document_type")
+        if doc_type not in DOCUMENT_TEMPLATES:
             return Response({"error": "Unknown document type"}, status=400)
-        
-       
-        return FileResponse(
-            pdf_buffer,
-            as_attachment=True,
-            filename=f"{doc_type}.pdf",
-            content_type="application/pdf",
-        )
+        output_format = request.data.get("format", "zip")
+        if output_format not in ("zip", "pdf"):
+            return Response({"error": "Format must be 'zip' or 'pdf'"}, status=400)
+
+        filters = {key: request.data.get(key) for key in ("state", "district", "wing", "user_ids") if request.data.get(key)}
+        task = generate_document_batch.delay(doc_type, filters=filters, output_format=output_format)
+        return Response({"job_id": task.id}, status=status.HTTP_202_ACCEPTED)
+
+class DocumentBatchStatusView(APIView):
+    permission_classes = [IsAdminOrIsStaff]
+
+    def get(self, request, job_id):
+        result = AsyncResult(job_id)
+        data = {"job_id": job_id, "status": result.state}
+        if result.state == "PROGRESS":
+            data.update(result.info)
+        elif result.successful():
+            data.update(result.result)
+            data["files"] = [
+                request.build_absolute_uri(reverse("document-batch-download", args=[job_id, index]))
+                for index in range(len(result.result["files"]))
+            ]
+        elif result.failed():
+            data["error"] = str(result.result)
+        return Response(data, status=status.HTTP_200_OK)
+
+class DocumentBatchDownloadView(APIView):
+    """One output file of a finished batch, from the private document store."""
+    permission_classes = [IsAdminOrIsStaff]
+
+    def get(self, request, job_id, index):
+        result = AsyncResult(job_id)
+        if not result.successful():
+            return Response({"error": "Batch is not ready", "status": result.state}, status=409)
+        files = result.result["files"]
+        if index >= len(files) or not document_exists(files[index]):
+            return Response({"error": "File not found"}, status=404)
+        name = files[index]
+        content_type = "application/zip" if name.endswith(".zip") else "application/pdf"
+        return serve_document(name, os.path.basename(name), content_type=content_type)
+
+class FuzzySearchView(APIView):
+    """Typo-tolerant name search: ?type=vyapari|district|state|user&q=...&limit=10"""
+
+    def get_permissions(self):
+        if self.request.query_params.get("type") == "user":
+            return [IsAdminOrIsStaff()]
+        return [AllowAny()]
+
+    def get(self, request):
+        index = FUZZY_INDEXES.get(request.query_params.get("type"))
+        if index is None:
+            return Response({"error": f"type must be one of: {', '.join(FUZZY_INDEXES)}"}, status=400)
+        query = request.query_params.get("q", "").strip()
+        if not query:
+            return Response({"error": "Missing query"}, status=400)
+        try:
+            limit = min(max(int(request.query_params.get("limit", 10)), 1), 50)
+        except ValueError:
+            return Response({"error": "limit must be a number"}, status=400)
+        return Response({"results": index.search(query, limit=limit)}, status=status.HTTP_200_OK)
 
 class DistrictListView(ListAPIView):
     permission_classes = [AllowAny]
@@ -151,4 +206,4 @@ class DistrictListView(ListAPIView):
 class StateListView(ListAPIView):
     permission_classes = [AllowAny]
     queryset = State.objects.all()
-    serializer_class = StateSerializer
\ No newline at end of file
+    serializer_class = StateSerializer
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Payment
+from .models import Payment, PaymentDailyStat
 # Register your models here.
 
 @admin.register(Payment)
@@ -7,4 +7,10 @@ class PaymentAdmin(admin.ModelAdmin):
     list_display = ('name', 'email', 'phone', 'amount', 'status', 'timestamp')
     search_fields = ('name', 'email', 'phone', 'order_id', 'payment_id')
     list_filter = ('status', 'timestamp')
-    readonly_fields = ('timestamp',)
\ No newline at end of file
+    readonly_fields = ('timestamp',)
+
+@admin.register(PaymentDailyStat)
+class PaymentDailyStatAdmin(admin.ModelAdmin):
+    list_display = ('date', 'payment_for', 'status', 'count', 'amount')
+    list_filter = ('status', 'payment_for')
+    date_hierarchy = 'date'
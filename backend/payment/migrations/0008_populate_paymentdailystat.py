@@ -0,0 +1,33 @@
+from django.db import migrations
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def populate(apps, schema_editor):
+    Payment = apps.get_model('payment', 'Payment')
+    PaymentDailyStat = apps.get_model('payment', 'PaymentDailyStat')
+    rows = (
+        Payment.objects.annotate(day=TruncDate('timestamp'))
+        .values('day', 'payment_for', 'status')
+        .annotate(count=Count('pk'), amount=Sum('amount'))
+        .order_by()
+    )
+    PaymentDailyStat.objects.bulk_create(
+        [
+            PaymentDailyStat(date=row['day'], payment_for=row['payment_for'], status=row['status'],
+                             count=row['count'], amount=row['amount'] or 0)
+            for row in rows
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment', '0007_paymentdailystat'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate, migrations.RunPython.noop),
+    ]
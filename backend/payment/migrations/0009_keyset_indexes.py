@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment', '0008_populate_paymentdailystat'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['timestamp', 'id'], name='payment_timestamp_id'),
+        ),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.db.models import JSONField
 from django.contrib.postgres.indexes import GinIndex
 
@@ -31,9 +31,38 @@ class Payment(models.Model):
     def __str__(self):
         return f"{self.order_id} - {self.amount} - {self.status}"
 
+    def save(self, *args, **kwargs):
+        # The post_save rollup update (payment.signals) commits or rolls back
+        # together with the payment row
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
     class Meta:
         indexes = [
             GinIndex(fields=['payment_details']),
             models.Index(fields=['timestamp']),
+            # Keyset pagination on (timestamp, id)
+            models.Index(fields=['timestamp', 'id'], name='payment_timestamp_id'),
         ]
         ordering = ['-timestamp']
+
+
+class PaymentDailyStat(models.Model):
+    """
+    Daily rollup of payments per payment_for and status, kept in step with
+    Payment by payment.stats (signals) and rebuilt by reconcile_payment_stats.
+    """
+    date = models.DateField()
+    payment_for = models.CharField(max_length=255)
+    status = models.CharField(max_length=10, choices=Payment.STATUS_CHOICES)
+    count = models.IntegerField(default=0)
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f"{self.date} - {self.payment_for} - {self.status}: {self.count}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'payment_for', 'status'], name='unique_payment_daily_stat'),
+        ]
+        ordering = ['-date']
@@ -0,0 +1,34 @@
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from .models import Payment
+from .stats import apply_contribution, contribution
+
+
+@receiver(post_init, sender=Payment)
+def remember_contribution(sender, instance, **kwargs):
+    # Deferred fields can't be diffed; reconciliation covers those
+    loaded = {'timestamp', 'payment_for', 'status', 'amount'} <= instance.__dict__.keys()
+    instance._stat_contribution = contribution(instance) if loaded and instance.pk else None
+
+
+@receiver(post_save, sender=Payment)
+def payment_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    old, new = instance._stat_contribution, contribution(instance)
+    if old == new:
+        return
+    # Runs inside Payment.save's transaction (deletes run inside the deletion's)
+    if old:
+        apply_contribution(old[0], -1, -old[1])
+    if new:
+        apply_contribution(new[0], 1, new[1])
+    instance._stat_contribution = new
+
+
+@receiver(post_delete, sender=Payment)
+def payment_deleted(sender, instance, **kwargs):
+    old = instance._stat_contribution
+    if old:
+        apply_contribution(old[0], -1, -old[1])
@@ -0,0 +1,141 @@
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Payment, PaymentDailyStat
+
+
+# -------------------------------
+# Payment rollup
+# -------------------------------
+#
+# PaymentDailyStat holds count and amount per (day, payment_for, status). Every
+# Payment save moves its contribution from the bucket it was loaded in to the one
+# it is saved in (see signals.py), in the same transaction as the payment row
+# (Payment.save is atomic), so the two commit or roll back together. Writes that
+# bypass signals are repaired by reconcile_payment_stats().
+
+def _bucket(payment):
+    if payment.timestamp is None:
+        return None
+    return (timezone.localdate(payment.timestamp), payment.payment_for, payment.status)
+
+
+def contribution(payment):
+    """The (bucket, amount) a payment adds to the rollup, or None if it isn't saved yet."""
+    bucket = _bucket(payment)
+    return (bucket, payment.amount or 0) if bucket else None
+
+
+def apply_contribution(bucket, count, amount):
+    """Add count and amount to a rollup bucket, creating it if needed."""
+    day, payment_for, status = bucket
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {PaymentDailyStat._meta.db_table} (date, payment_for, status, count, amount)
+            VALUES (%s, %s, %s, %s, %s)
+            ON CONFLICT (date, payment_for, status)
+            DO UPDATE SET count = {PaymentDailyStat._meta.db_table}.count + EXCLUDED.count,
+                          amount = {PaymentDailyStat._meta.db_table}.amount + EXCLUDED.amount
+            """,
+            [day, payment_for, status, count, amount],
+        )
+
+
+def reconcile_payment_stats(start=None, end=None):
+    """
+    Rebuild the rollup from payment_payment for days in [start, end] (inclusive,
+    open-ended when omitted). Returns the number of buckets written.
+    """
+    payments = Payment.objects.annotate(day=TruncDate('timestamp'))
+    stats = PaymentDailyStat.objects.all()
+    if start:
+        payments = payments.filter(day__gte=start)
+        stats = stats.filter(date__gte=start)
+    if end:
+        payments = payments.filter(day__lte=end)
+        stats = stats.filter(date__lte=end)
+
+    rows = (
+        payments.values('day', 'payment_for', 'status')
+        .annotate(count=Count('pk'), amount=Sum('amount'))
+        .order_by()
+    )
+    with transaction.atomic():
+        # The lock conflicts with the rollup upserts of payment transactions: one
+        # that upserted already holds its lock until it commits, so its payment
+        # is committed (and counted here) before the rebuild reads; one that
+        # upserts later waits for the rebuild, whose read doesn't see its still
+        # uncommitted payment, and then adds it once. Nothing is counted twice or
+        # missed.
+        with connection.cursor() as cursor:
+            cursor.execute(f"LOCK TABLE {PaymentDailyStat._meta.db_table} IN EXCLUSIVE MODE")
+        stats.delete()
+        created = PaymentDailyStat.objects.bulk_create(
+            [
+                PaymentDailyStat(date=row['day'], payment_for=row['payment_for'], status=row['status'],
+                                 count=row['count'], amount=row['amount'] or 0)
+                for row in rows
+            ],
+            batch_size=1000,
+        )
+    return len(created)
+
+
+def _month_range(today):
+    start = today.replace(day=1)
+    end = (start + timedelta(days=32)).replace(day=1)
+    return start, end
+
+
+def payment_stats(start=None, end=None, payment_for=None):
+    """
+    Payment statistics from the rollup in a single query. `start`/`end` (dates,
+    inclusive) and `payment_for` narrow the all-time figures; the monthly figures
+    always cover the current month.
+    """
+    scope = Q()
+    if start:
+        scope &= Q(date__gte=start)
+    if end:
+        scope &= Q(date__lte=end)
+    if payment_for:
+        scope &= Q(payment_for=payment_for)
+    month_start, month_end = _month_range(timezone.localdate())
+    this_month = Q(date__gte=month_start, date__lt=month_end)
+
+    totals = PaymentDailyStat.objects.aggregate(
+        total_revenue=Sum('amount', filter=scope & Q(status='COMPLETED')),
+        monthly_revenue=Sum('amount', filter=this_month & Q(status='COMPLETED')),
+        total_transactions=Sum('count', filter=scope),
+        successful_transactions=Sum('count', filter=scope & Q(status='COMPLETED')),
+        failed_transactions=Sum('count', filter=scope & Q(status='FAILED')),
+        pending_transactions=Sum('count', filter=scope & Q(status='PENDING')),
+        active_subscribers=Sum('count', filter=scope & Q(payment_for__icontains='subscription')),
+        this_month_donations=Sum('count', filter=this_month & Q(payment_for__icontains='donation')),
+    )
+    return {key: value or 0 for key, value in totals.items()}
+
+
+def payment_stats_by_payment_for(start=None, end=None):
+    """Per-payment_for totals from the rollup for days in [start, end]."""
+    stats = PaymentDailyStat.objects.all()
+    if start:
+        stats = stats.filter(date__gte=start)
+    if end:
+        stats = stats.filter(date__lte=end)
+    return list(
+        stats.values('payment_for')
+        .annotate(
+            revenue=Sum('amount', filter=Q(status='COMPLETED')),
+            transactions=Sum('count'),
+            successful=Sum('count', filter=Q(status='COMPLETED')),
+            failed=Sum('count', filter=Q(status='FAILED')),
+            pending=Sum('count', filter=Q(status='PENDING')),
+        )
+        .order_by('payment_for')
+    )
@@ -0,0 +1,13 @@
+from datetime import timedelta
+
+from celery import shared_task
+from django.utils import timezone
+
+from .stats import reconcile_payment_stats
+
+
+@shared_task
+def reconcile_payment_stats_task(days=None):
+    """Rebuild the payment rollup, for the last `days` days or entirely."""
+    start = timezone.localdate() - timedelta(days=days) if days else None
+    return reconcile_payment_stats(start=start)
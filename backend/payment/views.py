@@ -1,23 +1,19 @@
-import os
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from django.conf import settings
-from django.db.models import Sum
-from django.utils.timezone import now
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter
 from rest_framework.generics import ListAPIView
 
 from account.models import User
-from account.tasks import send_async_email
-from dashboard.pdf_builder.utils.builder import generate_pdf
-from dashboard.pdf_builder.utils.templates import JOINING_LETTER_LAYOUT
+from account.mail import queue_email
 from .models import Payment
+from .stats import payment_stats, payment_stats_by_payment_for
 from .serializers import PaymentSerializer
 from dashboard.permissions import IsAdminOrIsStaff
-from dashboard.filters import PaymentFilter
+from dashboard.filters import PaymentFilter, query_date
 
 import razorpay
 
@@ -130,19 +126,10 @@ class OrderVerifyView(APIView):
                 if user:
                     user.is_member_account = True
                     user.save()
-                    template_path = os.path.join(settings.BASE_DIR, "dashboard", "pdf_builder", "templates", "documents", "member_welcome_letter.pdf")
-                    layout = JOINING_LETTER_LAYOUT
-                    data = {
-                        "name": user.name,
-                        "address": f'{user.city}, {user.district}, {user.state}',
-                        "joining_date": user.date_joined.strftime("%d-%m-%Y"),
-                        "reg_no": f'{user.user_id}',
-                    }
-                    pdf_buffer = generate_pdf(template_path, data, document_type=None, layout=layout)
                     email_subject = "Welcome to RSS - Membership Confirmation"
                     email_message = f"Dear {user.name},\n\nWelcome to the RSS family! Please find attached your membership welcome letter.\n\nBest regards,\nRSS Team"
-                    recipient_list = [user.email]
-                    send_async_email.delay(email_subject, email_message, recipient_list, pdf_data=pdf_buffer.getvalue(), pdf_filename="member_welcome_letter.pdf")
+                    # The letter is rendered (or fetched) when the mail queue sends it
+                    queue_email(email_subject, email_message, [user.email], document_user=user, document_type="welcome_letter", attachment_name="member_welcome_letter.pdf")
             payment.save()
             
             return Response({
@@ -159,45 +146,38 @@ class OrderVerifyView(APIView):
 
 class PaymentStatView(APIView):
     def get(self, request):
-        current_month = now().month
-        current_year = now().year
-
-        total_revenue = (
-            Payment.objects.filter(status='COMPLETED')
-            .aggregate(total=Sum('amount'))['total'] or 0
-        )
-
-        monthly_revenue = (
-            Payment.objects.filter(
-                status='COMPLETED',
-                timestamp__year=current_year,
-                timestamp__month=current_month
-            ).aggregate(total=Sum('amount'))['total'] or 0
-        )
-
-        total_transactions = Payment.objects.count()
-        successful_transactions = Payment.objects.filter(status='COMPLETED').count()
-        failed_transactions = Payment.objects.filter(status='FAILED').count()
-        pending_transactions = Payment.objects.filter(status='PENDING').count()
-
-        active_subscribers = Payment.objects.filter(payment_for__icontains='subscription').count()
-        this_month_donations = Payment.objects.filter(
-            payment_for__icontains='donation',
-            timestamp__year=current_year,
-            timestamp__month=current_month
-        ).count()
+        try:
+            start = query_date(request, 'start')
+            end = query_date(request, 'end')
+        except ValueError:
+            return Response({"error": "Invalid date, use YYYY-MM-DD."}, status=status.HTTP_400_BAD_REQUEST)
+        payment_for = request.query_params.get('payment_for')
 
+        totals = payment_stats(start=start, end=end, payment_for=payment_for)
         stats = {
-            "totalRevenue": float(total_revenue),
-            "monthlyRevenue": float(monthly_revenue),
-            "totalTransactions": total_transactions,
-            "successfulTransactions": successful_transactions,
-            "failedTransactions": failed_transactions,
-            "pendingTransactions": pending_transactions,
-            "activeSubscribers": active_subscribers,
-            "thisMonthDonations": this_month_donations,
+            "totalRevenue": float(totals['total_revenue']),
+            "monthlyRevenue": float(totals['monthly_revenue']),
+            "totalTransactions": totals['total_transactions'],
+            "successfulTransactions": totals['successful_transactions'],
+            "failedTransactions": totals['failed_transactions'],
+            "pendingTransactions": totals['pending_transactions'],
+            "activeSubscribers": totals['active_subscribers'],
+            "thisMonthDonations": totals['this_month_donations'],
         }
 
+        if request.query_params.get('breakdown') == 'payment_for':
+            stats["byPaymentFor"] = [
+                {
+                    "paymentFor": row['payment_for'],
+                    "revenue": float(row['revenue'] or 0),
+                    "totalTransactions": row['transactions'] or 0,
+                    "successfulTransactions": row['successful'] or 0,
+                    "failedTransactions": row['failed'] or 0,
+                    "pendingTransactions": row['pending'] or 0,
+                }
+                for row in payment_stats_by_payment_for(start=start, end=end)
+            ]
+
         return Response(stats)
     
 class PaymentCreateView(APIView):
@@ -214,6 +194,7 @@ class PaymentListView(ListAPIView):
     permission_classes = [IsAdminOrIsStaff]
     queryset = Payment.objects.all()
     serializer_class = PaymentSerializer
+    keyset_ordering = ('-timestamp', '-id')
     filter_backends = [SearchFilter, DjangoFilterBackend]
     filterset_class = PaymentFilter
     search_fields = ['payment_id', 'order_id', 'name', 'email', 'phone']
@@ -233,6 +214,7 @@ class PaymentDetailView(APIView):
 class UserPaymentListView(ListAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = PaymentSerializer
+    keyset_ordering = ('-timestamp', '-id')
     def get_queryset(self):
         user = self.request.user
         return Payment.objects.filter(email=user.email).order_by('-timestamp')
\ No newline at end of file
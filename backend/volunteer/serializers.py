@@ -35,6 +35,12 @@ class VolunteerSerializer(ModelSerializer):
         model = Volunteer
         fields = '__all__'
 
+    def to_representation(self, instance):
+        # Annotated on the volunteer by the views; UserInfoSerializer reads it from the user
+        if hasattr(instance, 'user_referral_count'):
+            instance.user.referral_count = instance.user_referral_count
+        return super().to_representation(instance)
+
 class ApplicationSerializer(ModelSerializer):
     user_name = serializers.CharField(source='user.username', read_only=True)
     wing_name = serializers.CharField(source='wing.name', read_only=True)
@@ -1,3 +1,64 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from account.models import User
+from .models import Designation, Level, Volunteer, VolunteerWorkingArea, Wing
+
+# Signals touch the shared cache (user counters, fuzzy index versions)
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHES, QUERY_BUDGET_ACTION='raise')
+class VolunteerQueryCountTests(TestCase):
+    # page count + page + working_areas prefetch
+    LIST_QUERIES = 3
+    # volunteer + working_areas prefetch
+    DETAIL_QUERIES = 2
+
+    @classmethod
+    def setUpTestData(cls):
+        wing = Wing.objects.create(name='Wing', description='')
+        level = Level.objects.create(name='Level', wing=wing)
+        designation = Designation.objects.create(title='Designation', level=level, total_positions=10)
+        referrer = User.objects.create(username='referrer', email='referrer@example.com', user_id='REF0001')
+        cls.volunteers = []
+        for i in range(30):
+            user = User.objects.create(
+                username=f'volunteer{i}', email=f'volunteer{i}@example.com', user_id=f'VOL{i:04}',
+                name=f'Volunteer {i}', referred_by=referrer,
+            )
+            volunteer = Volunteer.objects.create(
+                user=user, phone_number=f'90000{i:05}', wing=wing, level=level, designation=designation,
+            )
+            VolunteerWorkingArea.objects.bulk_create(
+                VolunteerWorkingArea(volunteer=volunteer, area_name=f'Area {i}.{n}') for n in range(3)
+            )
+            cls.volunteers.append(volunteer)
+        for i in range(2):
+            User.objects.create(
+                username=f'referred{i}', email=f'referred{i}@example.com', user_id=f'REFD{i:04}',
+                referred_by=cls.volunteers[0].user,
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_list_query_count_does_not_grow_with_page_size(self):
+        for page_size in (1, 10, 30):
+            with self.subTest(page_size=page_size), self.assertNumQueries(self.LIST_QUERIES):
+                response = self.client.get(reverse('volunteer-list-create'), {'page_size': page_size})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data['results']), page_size)
+            first = response.data['results'][0]
+            self.assertEqual(first['user']['referred_by'], 'REF0001')
+            self.assertEqual(first['wing_name'], 'Wing')
+            self.assertEqual(len(first['working_areas']), 3)
+            self.assertIn('referral_count', first['user'])
+
+    def test_detail_query_count(self):
+        with self.assertNumQueries(self.DETAIL_QUERIES):
+            response = self.client.get(reverse('volunteer-detail', args=[self.volunteers[0].pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['designation_title'], 'Designation')
+        self.assertEqual(response.data['user']['referral_count'], 2)
@@ -1,7 +1,8 @@
 from rest_framework.response import Response
 from rest_framework.generics import ListCreateAPIView, RetrieveUpdateDestroyAPIView
 from rest_framework.permissions import AllowAny
-from django.db.models import Count
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from rest_framework.filters import SearchFilter
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import status
@@ -87,8 +88,21 @@ class DesignationDetailView(RetrieveUpdateDestroyAPIView):
             return [IsAdminOrIsStaff()]
         return [AllowAny()]
 
+# Relations VolunteerSerializer reads, so a page costs the same number of queries
+# whatever its size (see tests.py)
+VOLUNTEER_SELECT_RELATED = ('user', 'user__referred_by', 'wing', 'level', 'designation')
+VOLUNTEER_PREFETCH_RELATED = ('working_areas',)
+# The nested user's referral_count, as a subquery of the volunteer query
+USER_REFERRAL_COUNT = Coalesce(
+    Subquery(
+        User.objects.filter(referred_by=OuterRef('user')).order_by()
+        .values('referred_by').annotate(count=Count('pk')).values('count')
+    ),
+    0,
+)
+
 class VolunteerListCreateView(ListCreateAPIView):
-    queryset = Volunteer.objects.all()
+    queryset = Volunteer.objects.select_related(*VOLUNTEER_SELECT_RELATED).prefetch_related(*VOLUNTEER_PREFETCH_RELATED).annotate(user_referral_count=USER_REFERRAL_COUNT)
     serializer_class = VolunteerSerializer
     filter_backends = [DjangoFilterBackend, SearchFilter]
     filterset_class = VolunteerFilter
@@ -100,7 +114,7 @@ class VolunteerListCreateView(ListCreateAPIView):
         return [AllowAny()]
     
 class VolunteerDetailView(RetrieveUpdateDestroyAPIView):
-    queryset = Volunteer.objects.all()
+    queryset = Volunteer.objects.select_related(*VOLUNTEER_SELECT_RELATED).prefetch_related(*VOLUNTEER_PREFETCH_RELATED).annotate(user_referral_count=USER_REFERRAL_COUNT)
     serializer_class = VolunteerSerializer
 
     def get_permissions(self):
@@ -127,7 +141,7 @@ class VolunteerWorkingAreaListCreateView(ListCreateAPIView):
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     
 class ApplicationListCreateView(ListCreateAPIView):
-    queryset = Application.objects.all()
+    queryset = Application.objects.select_related('user', 'wing', 'level', 'designation')
     serializer_class = ApplicationSerializer
     filter_backends = [DjangoFilterBackend, SearchFilter]
     filterset_fields = ['status', 'wing', 'level', 'designation']
@@ -148,7 +162,7 @@ class ApplicationListCreateView(ListCreateAPIView):
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 class ApplicationDetailView(RetrieveUpdateDestroyAPIView):
-    queryset = Application.objects.all()
+    queryset = Application.objects.select_related('user', 'user__referred_by', 'wing', 'level', 'designation')
     serializer_class = ApplicationDetailSerializer
 
     def get_permissions(self):
@@ -0,0 +1,185 @@
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import redis
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.db.models.functions import TruncDate
+
+from .models import Advertisement, AdvertisementHourlyStat, AdvertisementStatFlush
+
+
+# -------------------------------
+# Ad impression and click counters
+# -------------------------------
+#
+# Serving or clicking an ad only increments Redis counters: one hash per UTC hour
+# (ads:events:<YYYYmmddHH>) with "<ad id>:i" / "<ad id>:c" fields, and the hour is
+# added to a set of hours with pending events. flush_ad_stats(), run by celery
+# beat, renames each pending hash to a uniquely named batch (so new events start
+# a fresh one) and records the batch in a set, in one MULTI. Each batch's counts
+# are added to AdvertisementHourlyStat in one upsert, in the same transaction as
+# an AdvertisementStatFlush row naming the batch, and the batch is deleted after
+# the commit. A batch left behind by a failed flush is retried by the next one,
+# and skipped there if its flush row shows it was already written, so no count
+# is added twice. Counting is best-effort: events are dropped while Redis is
+# unreachable.
+
+PENDING_HOURS_KEY = "ads:events:hours"
+FLUSHING_BATCHES_KEY = "ads:events:flushing"
+EVENTS_TTL = 7 * 24 * 60 * 60
+FLUSH_LOCK_ID = 7310002
+IMPRESSION = "i"
+CLICK = "c"
+
+_client = None
+
+
+def get_client():
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+    return _client
+
+
+def _events_key(hour):
+    return f"ads:events:{hour}"
+
+
+def _batch_key(batch):
+    return f"ads:events:batch:{batch}"
+
+
+def _current_hour():
+    return datetime.now(dt_timezone.utc).strftime("%Y%m%d%H")
+
+
+def _record(ad_ids, event):
+    hour = _current_hour()
+    key = _events_key(hour)
+    try:
+        pipe = get_client().pipeline(transaction=False)
+        for ad_id in ad_ids:
+            pipe.hincrby(key, f"{ad_id}:{event}", 1)
+        pipe.expire(key, EVENTS_TTL)
+        pipe.sadd(PENDING_HOURS_KEY, hour)
+        pipe.execute()
+    except redis.RedisError:
+        pass
+
+
+def record_impressions(ad_ids):
+    if ad_ids:
+        _record(ad_ids, IMPRESSION)
+
+
+def record_click(ad_id):
+    _record([ad_id], CLICK)
+
+
+def _write_counts(batch, hour, counts):
+    """
+    Add a flushed events batch to the hourly rollup, unless it was already.
+    Returns the number of rows written.
+    """
+    totals = defaultdict(lambda: [0, 0])
+    for field, value in counts.items():
+        ad_id, _, event = field.partition(":")
+        totals[int(ad_id)][0 if event == IMPRESSION else 1] += int(value)
+    # Ads deleted since they were served are dropped
+    existing = set(Advertisement.objects.filter(pk__in=totals).values_list('pk', flat=True))
+    when = datetime.strptime(hour, "%Y%m%d%H").replace(tzinfo=dt_timezone.utc)
+    rows = [(ad_id, when, impressions, clicks) for ad_id, (impressions, clicks) in totals.items() if ad_id in existing]
+    if not rows:
+        return 0
+    table = AdvertisementHourlyStat._meta.db_table
+    with transaction.atomic(), connection.cursor() as cursor:
+        _, created = AdvertisementStatFlush.objects.get_or_create(batch=batch)
+        if not created:
+            return 0
+        cursor.executemany(
+            f"""
+            INSERT INTO {table} (advertisement_id, hour, impressions, clicks)
+            VALUES (%s, %s, %s, %s)
+            ON CONFLICT (advertisement_id, hour)
+            DO UPDATE SET impressions = {table}.impressions + EXCLUDED.impressions,
+                          clicks = {table}.clicks + EXCLUDED.clicks
+            """,
+            rows,
+        )
+    return len(rows)
+
+
+def flush_ad_stats():
+    """
+    Move pending Redis counters into AdvertisementHourlyStat. Returns the number
+    of rollup rows written, or None if another flush is running.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_try_advisory_lock(%s)", [FLUSH_LOCK_ID])
+        if not cursor.fetchone()[0]:
+            return None
+    try:
+        client = get_client()
+        current = _current_hour()
+        for hour in sorted(client.smembers(PENDING_HOURS_KEY)):
+            key = _events_key(hour)
+            if client.exists(key):
+                batch = f"{hour}:{uuid.uuid4().hex}"
+                pipe = client.pipeline(transaction=True)
+                pipe.rename(key, _batch_key(batch))
+                pipe.sadd(FLUSHING_BATCHES_KEY, batch)
+                pipe.execute()
+            # Only the current hour can still receive events
+            if hour < current and not client.exists(key):
+                client.srem(PENDING_HOURS_KEY, hour)
+
+        written = 0
+        for batch in sorted(client.smembers(FLUSHING_BATCHES_KEY)):
+            counts = client.hgetall(_batch_key(batch))
+            if counts:
+                written += _write_counts(batch, batch.partition(":")[0], counts)
+            client.delete(_batch_key(batch))
+            client.srem(FLUSHING_BATCHES_KEY, batch)
+        # Batches expire from Redis after EVENTS_TTL, so older flush rows can't match
+        AdvertisementStatFlush.objects.filter(
+            flushed_at__lt=datetime.now(dt_timezone.utc) - timedelta(seconds=2 * EVENTS_TTL),
+        ).delete()
+        return written
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_unlock(%s)", [FLUSH_LOCK_ID])
+
+
+def ad_report(ad_ids, start=None, end=None, group_by_day=False):
+    """
+    Impressions and clicks of the given ads over [start, end] (dates, inclusive,
+    open-ended when omitted): {"totals": {...}, "ads": [...], "series": [...]},
+    with per-ad totals and series rows per hour, or per day with group_by_day.
+    """
+    stats = AdvertisementHourlyStat.objects.filter(advertisement_id__in=ad_ids)
+    if start:
+        stats = stats.filter(hour__gte=datetime.combine(start, datetime.min.time(), dt_timezone.utc))
+    if end:
+        stats = stats.filter(hour__lt=datetime.combine(end + timedelta(days=1), datetime.min.time(), dt_timezone.utc))
+
+    totals = stats.aggregate(impressions=Sum('impressions'), clicks=Sum('clicks'))
+    totals = {name: value or 0 for name, value in totals.items()}
+    totals['ctr'] = round(totals['clicks'] / totals['impressions'], 4) if totals['impressions'] else 0.0
+
+    ads = (
+        stats.values('advertisement')
+        .annotate(impressions=Sum('impressions'), clicks=Sum('clicks'))
+        .order_by('advertisement')
+    )
+    period = 'day' if group_by_day else 'hour'
+    if group_by_day:
+        stats = stats.annotate(day=TruncDate('hour', tzinfo=dt_timezone.utc))
+    series = (
+        stats.values(period)
+        .annotate(impressions=Sum('impressions'), clicks=Sum('clicks'))
+        .order_by(period)
+    )
+    return {"totals": totals, "ads": list(ads), "series": list(series)}
@@ -0,0 +1,150 @@
+import random
+import threading
+import time
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import Advertisement
+from .serializers import AdvertisementSerializer
+
+
+# -------------------------------
+# Ad serving
+# -------------------------------
+#
+# Ads are served from an in-memory index of the ads that are live today
+# (is_active, start_date <= today <= end_date), grouped by targeting key:
+# ("global", ""), ("state", <state>), ("district", <district>) and
+# ("market", <market>), taken from the advertising Vyapari's normalized address
+# columns. Each group keeps a Vose alias table over the ads' weights, so a
+# weighted pick is one random index plus one coin flip whatever the group size.
+#
+# Ad and Vyapari address changes bump a version number in the shared cache (see
+# signals.py); every worker rebuilds on its next request after a version change,
+# on the first request of a new day, and at least every MAX_INDEX_AGE seconds to
+# pick up writes that bypass signals.
+
+VERSION_KEY = "ads:index:version"
+MAX_INDEX_AGE = 600
+TARGETING_LEVELS = ("market", "district", "state")
+
+
+class _Pool:
+    """Ads of one targeting key with an alias table over their weights."""
+
+    def __init__(self, ads, weights):
+        self.ads = ads
+        n = len(ads)
+        total = sum(weights)
+        scaled = [w * n / total for w in weights]
+        self.prob = [1.0] * n
+        self.alias = list(range(n))
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            self.prob[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] -= 1.0 - scaled[s]
+            (small if scaled[l] < 1.0 else large).append(l)
+        # Whatever remains is 1.0 up to rounding error
+
+    def pick(self):
+        i = random.randrange(len(self.ads))
+        return i if random.random() < self.prob[i] else self.alias[i]
+
+    def sample(self, count):
+        """Up to `count` distinct ads, drawn by weight."""
+        count = min(count, len(self.ads))
+        chosen = {}
+        for _ in range(count * 4):
+            if len(chosen) == count:
+                break
+            chosen.setdefault(self.pick(), None)
+        # Rare with sensible weights: fill up in index order
+        for i in range(len(self.ads)):
+            if len(chosen) == count:
+                break
+            chosen.setdefault(i, None)
+        return [self.ads[i] for i in chosen]
+
+
+class AdIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pools = None  # {(level, value): _Pool}
+        self._live_ids = frozenset()
+        self._version = None
+        self._date = None
+        self._built_at = 0.0
+
+    def mark_changed(self):
+        """Tell every worker to rebuild the index."""
+        try:
+            cache.incr(VERSION_KEY)
+        except ValueError:
+            cache.set(VERSION_KEY, 1, timeout=None)
+
+    def _current_pools(self):
+        version = cache.get(VERSION_KEY, 0)
+        today = timezone.localdate()
+        if self._is_stale(version, today):
+            with self._lock:
+                if self._is_stale(version, today):
+                    self._build(version, today)
+        return self._pools
+
+    def _is_stale(self, version, today):
+        return (
+            self._pools is None
+            or version != self._version
+            or today != self._date
+            or time.monotonic() - self._built_at >= MAX_INDEX_AGE
+        )
+
+    def _build(self, version, today):
+        live = (
+            Advertisement.objects.filter(is_active=True, start_date__lte=today, end_date__gte=today)
+            .select_related('vyapari')
+            .order_by('pk')
+        )
+        groups = {}
+        for ad in live:
+            if ad.ad_type == 'global':
+                key = ('global', '')
+            else:
+                key = (ad.ad_type, getattr(ad.vyapari, f'address_{ad.ad_type}', ''))
+                if not key[1]:
+                    continue
+            ads, weights = groups.setdefault(key, ([], []))
+            ads.append(AdvertisementSerializer(ad).data)
+            weights.append(max(ad.weight, 1))
+        self._pools = {key: _Pool(ads, weights) for key, (ads, weights) in groups.items()}
+        self._live_ids = frozenset(ad['id'] for ads, _ in groups.values() for ad in ads)
+        self._version = version
+        self._date = today
+        self._built_at = time.monotonic()
+
+    def is_live(self, ad_id):
+        self._current_pools()
+        return ad_id in self._live_ids
+
+    def serve(self, market='', district='', state='', count=1):
+        """
+        Up to `count` live ads from the most specific targeting level given that
+        has any (market, then district, then state), else global ads. Values
+        must be normalized (normalize_location).
+        """
+        pools = self._current_pools()
+        targets = {'market': market, 'district': district, 'state': state}
+        for level in TARGETING_LEVELS:
+            if targets[level]:
+                pool = pools.get((level, targets[level]))
+                if pool is not None:
+                    return pool.sample(count)
+        pool = pools.get(('global', ''))
+        return pool.sample(count) if pool is not None else []
+
+
+AD_INDEX = AdIndex()
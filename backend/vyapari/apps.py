@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class VyapariConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'vyapari'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -1,5 +1,21 @@
 import django_filters
-from .models import Vyapari
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+from django.db.models import F
+from rest_framework.filters import SearchFilter
+
+from .models import Vyapari, normalize_location
+from .search import SEARCH_CONFIG
+
+
+class NormalizedLocationFilter(django_filters.CharFilter):
+    """
+    Filters an address column by a value normalized the same way as the column,
+    so plain (indexed) lookups replace case-insensitive ones.
+    """
+
+    def filter(self, qs, value):
+        return super().filter(qs, normalize_location(value))
+
 
 class VyapariFilter(django_filters.FilterSet):
     category = django_filters.CharFilter(
@@ -11,19 +27,19 @@ class VyapariFilter(django_filters.FilterSet):
         lookup_expr='iexact'
     )
 
-    city = django_filters.CharFilter(
-        field_name='address__city', 
-        lookup_expr='icontains',
+    city = NormalizedLocationFilter(
+        field_name='address_city',
+        lookup_expr='contains',
         label='City'
     )
-    state = django_filters.CharFilter(
-        field_name='address__state', 
-        lookup_expr='iexact',
+    state = NormalizedLocationFilter(
+        field_name='address_state',
+        lookup_expr='exact',
         label='State'
     )
-    district = django_filters.CharFilter(
-        field_name='address__district', 
-        lookup_expr='icontains'
+    district = NormalizedLocationFilter(
+        field_name='address_district',
+        lookup_expr='contains'
     )
 
     class Meta:
@@ -35,4 +51,30 @@ class VyapariFilter(django_filters.FilterSet):
             'city', 
             'state', 
             'district'
-        ]
\ No newline at end of file
+        ]
+
+
+class VyapariSearchFilter(SearchFilter):
+    """
+    Drop-in replacement for SearchFilter on Vyapari, using the `?search=` param.
+
+    Like SearchFilter, every term must occur somewhere in the listing's name,
+    address, tags or category; the match runs against the trigram-indexed
+    search_text column instead of ORed ILIKEs over joins. Results are ordered by
+    full-text rank, then trigram similarity.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        terms = [term.lower() for term in self.get_search_terms(request)]
+        if not terms:
+            return queryset
+
+        for term in terms:
+            queryset = queryset.filter(search_text__contains=term)
+
+        text = " ".join(terms)
+        query = SearchQuery(text, config=SEARCH_CONFIG)
+        return queryset.annotate(
+            search_rank=SearchRank(F('search_vector'), query),
+            search_similarity=TrigramWordSimilarity(text, 'search_text'),
+        ).order_by('-search_rank', '-search_similarity', 'pk')
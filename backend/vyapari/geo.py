@@ -0,0 +1,131 @@
+import math
+
+from django.db.models import Q
+
+
+# -------------------------------
+# Geohash helpers
+# -------------------------------
+#
+# Vyapari coordinates are stored with a geohash (see Vyapari.sync_location_columns)
+# whose btree index answers prefix queries. Points within a radius of a location
+# lie in the 3x3 block of geohash cells around it, as long as the cells are at
+# least as large as the radius, so a nearby search is a handful of prefix range
+# scans followed by exact haversine distances on the few candidates.
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+GEOHASH_PRECISION = 9
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = 110.574
+KM_PER_DEGREE_LNG = 111.320
+
+
+def encode(lat, lng, precision=GEOHASH_PRECISION):
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        rng, coord = (lng_range, lng) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        value <<= 1
+        if coord >= mid:
+            value |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits = value = 0
+    return "".join(chars)
+
+
+def cell_size(precision):
+    """(height, width) of a geohash cell in degrees."""
+    lng_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lng_bits
+
+
+def covered_radius_km(lat, precision):
+    """Radius around a point that the 3x3 block of cells around it always covers."""
+    height, width = cell_size(precision)
+    return min(height * KM_PER_DEGREE_LAT, width * KM_PER_DEGREE_LNG * math.cos(math.radians(lat)))
+
+
+def neighborhood(lat, lng, precision):
+    """Geohashes of the cell containing the point and its eight neighbours."""
+    height, width = cell_size(precision)
+    # Centre of the point's own cell
+    lat_c = (math.floor((lat + 90.0) / height) + 0.5) * height - 90.0
+    lng_c = (math.floor((lng + 180.0) / width) + 0.5) * width - 180.0
+    cells = set()
+    for dlat in (-1, 0, 1):
+        for dlng in (-1, 0, 1):
+            cell_lat = lat_c + dlat * height
+            if not -90.0 < cell_lat < 90.0:
+                continue
+            cell_lng = (lng_c + dlng * width + 180.0) % 360.0 - 180.0
+            cells.add(encode(cell_lat, cell_lng, precision))
+    return sorted(cells)
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def parse_coordinates(location):
+    """(lat, lng) floats from a location dict, or None if missing or invalid."""
+    if not isinstance(location, dict):
+        return None
+    try:
+        lat = float(location.get("latitude"))
+        lng = float(location.get("longitude"))
+    except (TypeError, ValueError):
+        return None
+    if not (-90.0 <= lat <= 90.0 and -180.0 <= lng <= 180.0) or math.isnan(lat) or math.isnan(lng):
+        return None
+    return lat, lng
+
+
+def search_precisions(lat, radius_km):
+    """
+    Precisions to try for a search, finest first. The last one is the finest
+    whose 3x3 block covers the whole radius; the two finer ones before it let a
+    k-nearest search stop early where businesses are dense.
+    """
+    covering = 1
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        if covered_radius_km(lat, precision) >= radius_km:
+            covering = precision
+            break
+    return list(range(min(covering + 2, GEOHASH_PRECISION), covering - 1, -1))
+
+
+def nearby(queryset, lat, lng, radius_km, limit):
+    """
+    The `limit` rows of `queryset` nearest to (lat, lng) within `radius_km`,
+    as a list of (pk, distance in km), nearest first.
+    """
+    found = []
+    for precision in search_precisions(lat, radius_km):
+        prefixes = Q()
+        for cell in neighborhood(lat, lng, precision):
+            prefixes |= Q(geohash__startswith=cell)
+        rows = queryset.filter(prefixes).values_list('pk', 'latitude', 'longitude')
+        found = sorted(
+            (distance, pk)
+            for pk, row_lat, row_lng in rows
+            if (distance := haversine_km(lat, lng, row_lat, row_lng)) <= radius_km
+        )
+        # Everything within the covered radius has been seen, so those results are final
+        covered = covered_radius_km(lat, precision)
+        if sum(1 for distance, _ in found[:limit] if distance <= covered) >= limit:
+            break
+    return [(pk, distance) for distance, pk in found[:limit]]
@@ -0,0 +1,70 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:21
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.operations import TrigramExtension
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations, models
+from django.db.models import Value
+
+
+# Frozen copy of vyapari.search as of this migration, so later changes to the
+# app code can't change or break it
+
+def _join(values):
+    return " ".join(str(value) for value in values if value)
+
+
+def populate_search_index(apps, schema_editor):
+    Vyapari = apps.get_model('vyapari', 'Vyapari')
+    for vyapari in Vyapari.objects.select_related('category', 'subcategory').iterator(chunk_size=500):
+        address = vyapari.address if isinstance(vyapari.address, dict) else {}
+        parts = {
+            "A": [vyapari.name],
+            "B": [
+                vyapari.category.name if vyapari.category_id else None,
+                vyapari.subcategory.name if vyapari.subcategory_id else None,
+                vyapari.tags,
+            ],
+            "C": [address.get(key) for key in ("city", "district", "state")],
+        }
+        vector = None
+        for weight in "ABC":
+            part = SearchVector(Value(_join(parts[weight])), weight=weight, config="simple")
+            vector = part if vector is None else vector + part
+        Vyapari.objects.filter(pk=vyapari.pk).update(
+            search_text=_join(value for weight in "ABC" for value in parts[weight]).lower(),
+            search_vector=vector,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vyapari', '0006_remove_vyapari_employee_count_vyapari_visiting_card'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='vyapari',
+            name='search_text',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='vyapari',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='vyapari',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='vyapari_search_vector'),
+        ),
+        migrations.AddIndex(
+            model_name='vyapari',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_text'], name='vyapari_search_text_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.RunPython(populate_search_index, migrations.RunPython.noop),
+    ]
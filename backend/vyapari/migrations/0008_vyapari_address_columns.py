@@ -0,0 +1,88 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:24
+
+import django.contrib.postgres.indexes
+from django.conf import settings
+from django.db import migrations, models
+
+
+# Frozen copies of vyapari.models.ADDRESS_COLUMNS and normalize_location as of
+# this migration, so later changes to the app code can't change or break it
+ADDRESS_COLUMNS = {
+    'state': 'address_state',
+    'district': 'address_district',
+    'city': 'address_city',
+    'market': 'address_market',
+}
+
+
+def normalize_location(value):
+    if not isinstance(value, str):
+        return ''
+    return ' '.join(value.split()).lower()
+
+
+def populate_address_columns(apps, schema_editor):
+    Vyapari = apps.get_model('vyapari', 'Vyapari')
+    batch = []
+    for vyapari in Vyapari.objects.only('pk', 'address').iterator(chunk_size=1000):
+        address = vyapari.address if isinstance(vyapari.address, dict) else {}
+        for key, column in ADDRESS_COLUMNS.items():
+            setattr(vyapari, column, normalize_location(address.get(key))[:100])
+        batch.append(vyapari)
+        if len(batch) >= 1000:
+            Vyapari.objects.bulk_update(batch, list(ADDRESS_COLUMNS.values()))
+            batch = []
+    if batch:
+        Vyapari.objects.bulk_update(batch, list(ADDRESS_COLUMNS.values()))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vyapari', '0007_vyapari_search'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vyapari',
+            name='address_city',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='vyapari',
+            name='address_district',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='vyapari',
+            name='address_market',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='vyapari',
+            name='address_state',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100),
+        ),
+        migrations.RunPython(populate_address_columns, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='vyapari',
+            index=models.Index(fields=['address_state', 'address_district'], name='vyapari_state_district'),
+        ),
+        migrations.AddIndex(
+            model_name='vyapari',
+            index=models.Index(fields=['address_district'], name='vyapari_district'),
+        ),
+        migrations.AddIndex(
+            model_name='vyapari',
+            index=models.Index(fields=['address_market'], name='vyapari_market'),
+        ),
+        migrations.AddIndex(
+            model_name='vyapari',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['address_city'], name='vyapari_city_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='vyapari',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['address_district'], name='vyapari_district_trgm', opclasses=['gin_trgm_ops']),
+        ),
+    ]
@@ -0,0 +1,96 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:26
+
+from django.conf import settings
+import math
+
+from django.db import migrations, models
+
+
+# Frozen copies of vyapari.geo.encode and parse_coordinates as of this
+# migration, so later changes to the app code can't change or break it
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def encode(lat, lng, precision=9):
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        rng, coord = (lng_range, lng) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        value <<= 1
+        if coord >= mid:
+            value |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits = value = 0
+    return "".join(chars)
+
+
+def parse_coordinates(location):
+    if not isinstance(location, dict):
+        return None
+    try:
+        lat = float(location.get("latitude"))
+        lng = float(location.get("longitude"))
+    except (TypeError, ValueError):
+        return None
+    if not (-90.0 <= lat <= 90.0 and -180.0 <= lng <= 180.0) or math.isnan(lat) or math.isnan(lng):
+        return None
+    return lat, lng
+
+
+def populate_location_columns(apps, schema_editor):
+    Vyapari = apps.get_model('vyapari', 'Vyapari')
+    batch = []
+    for vyapari in Vyapari.objects.only('pk', 'location').iterator(chunk_size=1000):
+        coordinates = parse_coordinates(vyapari.location)
+        if coordinates is None:
+            continue
+        vyapari.latitude, vyapari.longitude = coordinates
+        vyapari.geohash = encode(*coordinates)
+        batch.append(vyapari)
+        if len(batch) >= 1000:
+            Vyapari.objects.bulk_update(batch, ['latitude', 'longitude', 'geohash'])
+            batch = []
+    if batch:
+        Vyapari.objects.bulk_update(batch, ['latitude', 'longitude', 'geohash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vyapari', '0008_vyapari_address_columns'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vyapari',
+            name='geohash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=12),
+        ),
+        migrations.AddField(
+            model_name='vyapari',
+            name='latitude',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='vyapari',
+            name='longitude',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(populate_location_columns, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='vyapari',
+            index=models.Index(fields=['geohash'], name='vyapari_geohash', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vyapari', '0009_vyapari_location_columns'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='advertisement',
+            name='weight',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vyapari', '0010_advertisement_weight'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AdvertisementHourlyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField()),
+                ('impressions', models.PositiveIntegerField(default=0)),
+                ('clicks', models.PositiveIntegerField(default=0)),
+                ('advertisement', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='hourly_stats', to='vyapari.advertisement')),
+            ],
+            options={
+                'ordering': ['-hour'],
+                'constraints': [models.UniqueConstraint(fields=('advertisement', 'hour'), name='unique_advertisement_hourly_stat')],
+            },
+        ),
+    ]
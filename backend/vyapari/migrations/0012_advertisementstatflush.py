@@ -0,0 +1,21 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vyapari', '0011_advertisementhourlystat'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AdvertisementStatFlush',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('batch', models.CharField(max_length=64, unique=True)),
+                ('flushed_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+    ]
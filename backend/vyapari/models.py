@@ -1,9 +1,28 @@
-from django.db import models
+from django.db import models, transaction
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from account.models import User
+from .geo import encode as geohash_encode, parse_coordinates
 
 def vyapari_directory_path(instance, filename):
     return f'vyapari_uploads/{instance.name}/{filename}'
 
+# address JSON key -> indexed column it is projected into (see Vyapari.sync_address_columns)
+ADDRESS_COLUMNS = {
+    'state': 'address_state',
+    'district': 'address_district',
+    'city': 'address_city',
+    'market': 'address_market',
+}
+
+LOCATION_COLUMNS = ('latitude', 'longitude', 'geohash')
+
+def normalize_location(value):
+    """Lower-cased, whitespace-collapsed form used by the address columns."""
+    if not isinstance(value, str):
+        return ''
+    return ' '.join(value.split()).lower()
+
 class Category(models.Model):
     name = models.CharField(max_length=100, unique=True)
     image = models.ImageField(upload_to='category_images/')
@@ -50,8 +69,69 @@ class Vyapari(models.Model):
     tags = models.TextField(blank=True, null=True)
     referred_by = models.ForeignKey(User, on_delete=models.SET_NULL, blank=True, null=True, related_name='vyapari_referrals')
 
+    # Lower-cased copies of address keys for indexed filtering, kept in sync on save
+    address_state = models.CharField(max_length=100, blank=True, default='', editable=False)
+    address_district = models.CharField(max_length=100, blank=True, default='', editable=False)
+    address_city = models.CharField(max_length=100, blank=True, default='', editable=False)
+    address_market = models.CharField(max_length=100, blank=True, default='', editable=False)
+
+    # Parsed copy of location for nearby search (see vyapari.geo), kept in sync on save
+    latitude = models.FloatField(blank=True, null=True, editable=False)
+    longitude = models.FloatField(blank=True, null=True, editable=False)
+    geohash = models.CharField(max_length=12, blank=True, default='', editable=False)
+
+    # Search index, maintained by vyapari.search
+    search_text = models.TextField(blank=True, default='', editable=False)
+    search_vector = SearchVectorField(blank=True, null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['search_vector'], name='vyapari_search_vector'),
+            GinIndex(fields=['search_text'], name='vyapari_search_text_trgm', opclasses=['gin_trgm_ops']),
+            models.Index(fields=['address_state', 'address_district'], name='vyapari_state_district'),
+            models.Index(fields=['address_district'], name='vyapari_district'),
+            models.Index(fields=['address_market'], name='vyapari_market'),
+            # Substring filters on city/district (icontains)
+            GinIndex(fields=['address_city'], name='vyapari_city_trgm', opclasses=['gin_trgm_ops']),
+            GinIndex(fields=['address_district'], name='vyapari_district_trgm', opclasses=['gin_trgm_ops']),
+            # Prefix (LIKE 'abc%') scans for nearby search
+            models.Index(fields=['geohash'], name='vyapari_geohash', opclasses=['varchar_pattern_ops']),
+        ]
+
     def __str__(self):
         return self.name
+
+    def sync_address_columns(self):
+        address = self.address if isinstance(self.address, dict) else {}
+        for key, column in ADDRESS_COLUMNS.items():
+            setattr(self, column, normalize_location(address.get(key))[:100])
+
+    def sync_location_columns(self):
+        coordinates = parse_coordinates(self.location)
+        if coordinates is None:
+            self.latitude = self.longitude = None
+            self.geohash = ''
+        else:
+            self.latitude, self.longitude = coordinates
+            self.geohash = geohash_encode(*coordinates)
+
+    def save(self, *args, **kwargs):
+        self.sync_address_columns()
+        self.sync_location_columns()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            if 'address' in update_fields:
+                update_fields.update(ADDRESS_COLUMNS.values())
+            if 'location' in update_fields:
+                update_fields.update(LOCATION_COLUMNS)
+            kwargs['update_fields'] = update_fields
+        from .search import SEARCH_SOURCE_FIELDS, update_search_index
+        # The search index row commits or rolls back together with the vyapari row
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if update_fields is None or SEARCH_SOURCE_FIELDS.intersection(update_fields):
+                update_search_index(self)
     
 class Advertisement(models.Model):
     ADVERTISEMENT_TYPE=[
@@ -70,6 +150,32 @@ class Advertisement(models.Model):
     start_date = models.DateField()
     end_date = models.DateField()
     is_active = models.BooleanField(default=True)
+    # Relative share of impressions among ads with the same targeting (see vyapari.ads)
+    weight = models.PositiveIntegerField(default=1)
+
+    def __str__(self):
+        return f"{self.vyapari.name} - {self.title}"
+
+class AdvertisementHourlyStat(models.Model):
+    """Impressions and clicks per ad per hour, flushed from Redis by vyapari.ad_stats."""
+    advertisement = models.ForeignKey(Advertisement, related_name='hourly_stats', on_delete=models.CASCADE)
+    hour = models.DateTimeField()
+    impressions = models.PositiveIntegerField(default=0)
+    clicks = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.advertisement_id} - {self.hour:%Y-%m-%d %H:00}: {self.impressions}/{self.clicks}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['advertisement', 'hour'], name='unique_advertisement_hourly_stat'),
+        ]
+        ordering = ['-hour']
+
+class AdvertisementStatFlush(models.Model):
+    """A Redis events batch already added to AdvertisementHourlyStat, so it is never added twice."""
+    batch = models.CharField(max_length=64, unique=True)
+    flushed_at = models.DateTimeField(auto_now_add=True, db_index=True)
 
     def __str__(self):
-        return f"{self.vyapari.name} - {self.title}"
\ No newline at end of file
+        return self.batch
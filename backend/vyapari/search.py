@@ -0,0 +1,65 @@
+from django.contrib.postgres.search import SearchVector
+from django.db.models import Value
+
+
+# -------------------------------
+# Directory search index
+# -------------------------------
+#
+# Every Vyapari keeps two denormalized search columns, refreshed on save and when
+# its category or subcategory is renamed:
+#   search_text   - lowercased searchable text, trigram-indexed so substring
+#                   matches (ILIKE '%term%') use the index
+#   search_vector - weighted full-text vector used to rank matches
+# The 'simple' configuration is used because listings mix Hindi and English.
+
+SEARCH_CONFIG = "simple"
+SEARCH_ADDRESS_KEYS = ("city", "district", "state")
+# Vyapari fields the search columns are built from (as save(update_fields=...) names them)
+SEARCH_SOURCE_FIELDS = {"name", "tags", "address", "category", "category_id", "subcategory", "subcategory_id"}
+
+
+def search_parts(name, address, tags, category_name, subcategory_name):
+    """Searchable values grouped by rank weight (A most important)."""
+    address = address if isinstance(address, dict) else {}
+    return {
+        "A": [name],
+        "B": [category_name, subcategory_name, tags],
+        "C": [address.get(key) for key in SEARCH_ADDRESS_KEYS],
+    }
+
+
+def _join(values):
+    return " ".join(str(value) for value in values if value)
+
+
+def build_search_text(parts):
+    return _join(value for weight in "ABC" for value in parts[weight]).lower()
+
+
+def build_search_vector(parts):
+    vector = None
+    for weight in "ABC":
+        part = SearchVector(Value(_join(parts[weight])), weight=weight, config=SEARCH_CONFIG)
+        vector = part if vector is None else vector + part
+    return vector
+
+
+def vyapari_search_parts(vyapari):
+    return search_parts(
+        vyapari.name,
+        vyapari.address,
+        vyapari.tags,
+        vyapari.category.name if vyapari.category_id else None,
+        vyapari.subcategory.name if vyapari.subcategory_id else None,
+    )
+
+
+def update_search_index(vyapari):
+    """Refresh the search columns of a saved Vyapari in one UPDATE."""
+    parts = vyapari_search_parts(vyapari)
+    vyapari.search_text = build_search_text(parts)
+    type(vyapari).objects.filter(pk=vyapari.pk).update(
+        search_text=vyapari.search_text,
+        search_vector=build_search_vector(parts),
+    )
@@ -4,7 +4,8 @@ from .models import Vyapari, Category, SubCategory, Advertisement
 class VyapariSerializer(serializers.ModelSerializer):
     class Meta:
         model = Vyapari
-        fields = '__all__'
+        exclude = ['search_text', 'search_vector', 'address_state', 'address_district', 'address_city', 'address_market',
+                   'latitude', 'longitude', 'geohash']
 
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
@@ -0,0 +1,47 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from .ads import AD_INDEX
+from .models import Advertisement, Category, SubCategory, Vyapari
+from .search import update_search_index
+
+# Vyapari columns that ads are targeted by
+AD_TARGETING_FIELDS = ('address_state', 'address_district', 'address_market')
+
+
+@receiver(post_init, sender=Category)
+@receiver(post_init, sender=SubCategory)
+def remember_name(sender, instance, **kwargs):
+    instance._indexed_name = instance.__dict__.get('name')
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=SubCategory)
+def category_renamed(sender, instance, created, **kwargs):
+    if created or instance.name == instance._indexed_name:
+        return
+    instance._indexed_name = instance.name
+    field = 'category' if sender is Category else 'subcategory'
+    for vyapari in Vyapari.objects.filter(**{field: instance}).select_related('category', 'subcategory'):
+        update_search_index(vyapari)
+
+
+@receiver([post_save, post_delete], sender=Advertisement)
+def advertisement_changed(sender, instance, **kwargs):
+    transaction.on_commit(AD_INDEX.mark_changed)
+
+
+@receiver(post_init, sender=Vyapari)
+def remember_ad_targeting(sender, instance, **kwargs):
+    # Read from __dict__ so deferred fields aren't loaded
+    instance._ad_targeting = tuple(instance.__dict__.get(field) for field in AD_TARGETING_FIELDS)
+
+
+@receiver(post_save, sender=Vyapari)
+def vyapari_targeting_changed(sender, instance, created, **kwargs):
+    targeting = tuple(instance.__dict__.get(field) for field in AD_TARGETING_FIELDS)
+    if created or targeting == instance._ad_targeting:
+        return
+    instance._ad_targeting = targeting
+    transaction.on_commit(AD_INDEX.mark_changed)
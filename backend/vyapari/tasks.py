@@ -0,0 +1,9 @@
+from celery import shared_task
+
+from .ad_stats import flush_ad_stats
+
+
+@shared_task
+def flush_ad_stats_task():
+    """Move buffered ad impression/click counts into the hourly rollup."""
+    return flush_ad_stats()
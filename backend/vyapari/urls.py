@@ -1,13 +1,15 @@
 from django.urls import path
 from .views import (
-    VyapariListCreateView, VyapariDetailView, 
+    VyapariListCreateView, VyapariDetailView, NearbyVyapariView,
     CategoryListCreateView, CategoryDetailView, 
     SubCategoryListCreateView, SubCategoryDetailView, 
-    AdvertisementListCreateView, AdvertisementDetailView
+    AdvertisementListCreateView, AdvertisementDetailView, AdvertisementServeView,
+    AdvertisementClickView, AdvertisementStatsView
 )
 
 urlpatterns = [
     path('vyapari/', VyapariListCreateView.as_view(), name='vyapari-list'),
+    path('vyapari/nearby/', NearbyVyapariView.as_view(), name='vyapari-nearby'),
     path('vyapari/<int:pk>/', VyapariDetailView.as_view(), name='vyapari-detail'),
 
     path('category/', CategoryListCreateView.as_view(), name='category-list'),
@@ -17,5 +19,9 @@ urlpatterns = [
     path('subcategory/<int:pk>/', SubCategoryDetailView.as_view(), name='subcategory-detail'),
 
     path('advertisement/', AdvertisementListCreateView.as_view(), name='advertisement-list'),
+    path('advertisement/serve/', AdvertisementServeView.as_view(), name='advertisement-serve'),
+    path('advertisement/stats/', AdvertisementStatsView.as_view(), name='advertisement-stats'),
     path('advertisement/<int:pk>/', AdvertisementDetailView.as_view(), name='advertisement-detail'),
+    path('advertisement/<int:pk>/click/', AdvertisementClickView.as_view(), name='advertisement-click'),
+    path('advertisement/<int:pk>/stats/', AdvertisementStatsView.as_view(), name='advertisement-stats-detail'),
 ]
\ No newline at end of file
@@ -1,32 +1,28 @@
 from rest_framework.generics import ListCreateAPIView, RetrieveUpdateDestroyAPIView
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
 from django.db.models import Q 
-from rest_framework.filters import SearchFilter
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import serializers
 
-from .models import Vyapari, Category, SubCategory, Advertisement
+from .models import Vyapari, Category, SubCategory, Advertisement, normalize_location
 from .serializers import VyapariSerializer, CategorySerializer, SubCategorySerializer, AdvertisementSerializer
 from dashboard.permissions import IsAdminOrIsStaff
 from account.models import User
-from .filters import VyapariFilter
+from dashboard.filters import query_date
+from .filters import VyapariFilter, VyapariSearchFilter
+from .ads import AD_INDEX
+from .ad_stats import ad_report, record_click, record_impressions
+from .geo import nearby, parse_coordinates
 
 class VyapariListCreateView(ListCreateAPIView):
     queryset = Vyapari.objects.all()
     serializer_class = VyapariSerializer
     
-    filter_backends = [DjangoFilterBackend, SearchFilter] 
+    filter_backends = [DjangoFilterBackend, VyapariSearchFilter]
     
     filterset_class = VyapariFilter
-    search_fields = [
-        'name', 
-        'address__city', 
-        'address__state',
-        'address__district', 
-        'tags', 
-        'category__name',
-        'subcategory__name'
-    ]
 
     def perform_create(self, serializer):
         request = self.request
@@ -53,6 +49,47 @@ class VyapariListCreateView(ListCreateAPIView):
         else:
             serializer.save()
 
+class NearbyVyapariView(APIView):
+    """
+    Businesses nearest to ?latitude=&longitude=, within ?radius= km (default 5,
+    at most 100), at most ?limit= of them (default 20, at most 100), optionally
+    only those in ?category=.
+    """
+    permission_classes = [AllowAny]
+    DEFAULT_RADIUS = 5.0
+    MAX_RADIUS = 100.0
+    DEFAULT_LIMIT = 20
+    MAX_LIMIT = 100
+
+    def get(self, request):
+        params = request.query_params
+        coordinates = parse_coordinates(params)
+        if coordinates is None:
+            return Response({"error": "Valid latitude and longitude are required"}, status=400)
+        try:
+            radius = float(params.get('radius', self.DEFAULT_RADIUS))
+            limit = int(params.get('limit', self.DEFAULT_LIMIT))
+            category = int(params['category']) if params.get('category') else None
+        except ValueError:
+            return Response({"error": "radius, limit and category must be numbers"}, status=400)
+        if not 0 < radius <= self.MAX_RADIUS or not 0 < limit <= self.MAX_LIMIT:
+            return Response(
+                {"error": f"radius must be in (0, {self.MAX_RADIUS:g}] and limit in [1, {self.MAX_LIMIT}]"},
+                status=400,
+            )
+
+        queryset = Vyapari.objects.all()
+        if category is not None:
+            queryset = queryset.filter(category_id=category)
+        results = nearby(queryset, *coordinates, radius, limit)
+        vyaparis = queryset.in_bulk([pk for pk, _ in results])
+        data = []
+        for pk, distance in results:
+            item = VyapariSerializer(vyaparis[pk], context={'request': request}).data
+            item['distance_km'] = round(distance, 3)
+            data.append(item)
+        return Response({"count": len(data), "results": data})
+
 class VyapariDetailView(RetrieveUpdateDestroyAPIView):
     queryset = Vyapari.objects.all()
     serializer_class = VyapariSerializer
@@ -131,11 +168,11 @@ class AdvertisementListCreateView(ListCreateAPIView):
         q_objects = Q()
 
         if market:
-            q_objects = Q(ad_type='market', vyapari__address__market__iexact=market)
+            q_objects = Q(ad_type='market', vyapari__address_market=normalize_location(market))
         elif district:
-            q_objects = Q(ad_type='district', vyapari__address__district__iexact=district)
+            q_objects = Q(ad_type='district', vyapari__address_district=normalize_location(district))
         elif state:
-            q_objects = Q(ad_type='state', vyapari__address__state__iexact=state)
+            q_objects = Q(ad_type='state', vyapari__address_state=normalize_location(state))
         
         # if subcategory_name:
         #     q_objects &= Q(ad_type='subcategory', vyapari__subcategory__name__iexact=subcategory_name)
@@ -143,12 +180,46 @@ class AdvertisementListCreateView(ListCreateAPIView):
         #     q_objects &= Q(ad_type='category', vyapari__category__name__iexact=category_name)
         
         if q_objects:
-            queryset = queryset.filter(q_objects).distinct()
+            queryset = queryset.filter(q_objects)
         else:
             pass
 
         return queryset
     
+class AdvertisementServeView(APIView):
+    """
+    Live ads for a directory page, picked by weight from the ad index: up to
+    ?limit= (default 5, at most 20) ads targeted at ?market=, else ?district=,
+    else ?state=, else global ads.
+    """
+    permission_classes = [AllowAny]
+    DEFAULT_LIMIT = 5
+    MAX_LIMIT = 20
+
+    def get(self, request):
+        params = request.query_params
+        try:
+            limit = int(params.get('limit', self.DEFAULT_LIMIT))
+        except ValueError:
+            return Response({"error": "limit must be a number"}, status=400)
+        if not 0 < limit <= self.MAX_LIMIT:
+            return Response({"error": f"limit must be in [1, {self.MAX_LIMIT}]"}, status=400)
+
+        ads = AD_INDEX.serve(
+            market=normalize_location(params.get('market')),
+            district=normalize_location(params.get('district')),
+            state=normalize_location(params.get('state')),
+            count=limit,
+        )
+        record_impressions([ad['id'] for ad in ads])
+        results = []
+        for ad in ads:
+            ad = dict(ad)
+            if ad.get('image'):
+                ad['image'] = request.build_absolute_uri(ad['image'])
+            results.append(ad)
+        return Response({"results": results})
+
 class AdvertisementDetailView(RetrieveUpdateDestroyAPIView):
     queryset = Advertisement.objects.all()
     serializer_class = AdvertisementSerializer
@@ -156,4 +227,56 @@ class AdvertisementDetailView(RetrieveUpdateDestroyAPIView):
     def get_permissions(self):
         if self.request.method == 'GET':
             return [AllowAny()]
-        return [IsAdminOrIsStaff()]
\ No newline at end of file
+        return [IsAdminOrIsStaff()]
+
+class AdvertisementClickView(APIView):
+    """Count a click on a live ad."""
+    permission_classes = [AllowAny]
+
+    def post(self, request, pk):
+        if not AD_INDEX.is_live(pk):
+            return Response({"error": "Advertisement not found"}, status=404)
+        record_click(pk)
+        return Response(status=204)
+
+def _reportable_ads(request):
+    """Ads whose stats the user may see: all for admins and staff, their own business's otherwise."""
+    user = request.user
+    if user.is_admin_account or user.is_staff_account:
+        return Advertisement.objects.all()
+    if user.is_business_account and user.email:
+        return Advertisement.objects.filter(vyapari__email=user.email)
+    return Advertisement.objects.none()
+
+class AdvertisementStatsView(APIView):
+    """
+    Impressions and clicks between ?start= and ?end= (YYYY-MM-DD), per hour or
+    per day with ?group=day: for one ad at advertisement/<pk>/stats/, or for
+    every ad the user may see at advertisement/stats/ (admins and staff can
+    narrow that to ?vyapari=<id>).
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk=None):
+        try:
+            start = query_date(request, 'start')
+            end = query_date(request, 'end')
+        except ValueError:
+            return Response({"error": "Invalid date, use YYYY-MM-DD."}, status=400)
+
+        ads = _reportable_ads(request)
+        if pk is not None:
+            ads = ads.filter(pk=pk)
+            if not ads.exists():
+                return Response({"error": "Advertisement not found"}, status=404)
+        elif request.query_params.get('vyapari'):
+            try:
+                ads = ads.filter(vyapari_id=int(request.query_params['vyapari']))
+            except ValueError:
+                return Response({"error": "vyapari must be a number"}, status=400)
+
+        report = ad_report(
+            ads.values('pk'), start=start, end=end,
+            group_by_day=request.query_params.get('group') == 'day',
+        )
+        return Response(report)